@@ -1,16 +1,28 @@
 # bot.py
 import os
+import errno
 import sys
 import praw
-import requests
 import asyncio
 import discord
 import re
 import feedparser
+import aiohttp
 import json
+import html
+import heapq
+import hashlib
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
 from pathlib import Path
 from discord import app_commands
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 from urllib.parse import urlparse
 from zoneinfo import ZoneInfo
 
@@ -50,6 +62,23 @@ SUBREDDIT = os.environ.get("SUBREDDIT", "selfhosted")
 ALLOWED_FLAIRS = [f.strip() for f in os.environ.get("ALLOWED_FLAIR", "").split(",") if f.strip()]
 
 WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL", "").strip()
+
+def _parse_webhook_urls(raw: str) -> list[tuple[str, str]]:
+    """
+    "url1|reddit,url2|rss,url3" -> [(url1, "reddit"), (url2, "rss"), (url3, "all")]
+    The optional |source suffix limits a webhook to one pipeline.
+    """
+    out = []
+    for part in (raw or "").split(","):
+        url, _, source = part.strip().partition("|")
+        url = url.strip()
+        source = source.strip().lower()
+        if url:
+            out.append((url, source if source in ("reddit", "rss") else "all"))
+    return out
+
+# Extra webhooks beyond DISCORD_WEBHOOK_URL (which always receives both sources)
+WEBHOOK_URLS = _parse_webhook_urls(os.environ.get("DISCORD_WEBHOOK_URLS", ""))
 CHECK_INTERVAL = int(os.environ.get("CHECK_INTERVAL", 300))
 POST_LIMIT = int(os.environ.get("POST_LIMIT", 10))
 
@@ -75,6 +104,59 @@ HEADLESS = not (DISCORD_TOKEN and DISCORD_TOKEN.strip())
 GLOBAL_THREAD_MODE = os.environ.get("THREAD_MODE", "false").lower() == "true"
 THREAD_TTL_HOURS = int(os.environ.get("THREAD_TTL_HOURS", 24))
 
+# ---------- Reddit fetch pool ----------
+REDDIT_FETCH_WORKERS = int(os.environ.get("REDDIT_FETCH_WORKERS", 8))          # threads running PRAW calls
+REDDIT_FETCH_CONCURRENCY = int(os.environ.get("REDDIT_FETCH_CONCURRENCY", REDDIT_FETCH_WORKERS))  # in-flight listings per cycle
+REDDIT_FETCH_TIMEOUT = int(os.environ.get("REDDIT_FETCH_TIMEOUT", 30))         # seconds per subreddit/author listing
+
+# Multireddit batching: poll subreddits through combined r/a+b+c listings
+REDDIT_BATCH_SUBS = os.environ.get("REDDIT_BATCH_SUBS", "false").lower() == "true"
+REDDIT_BATCH_MAX_SUBS = int(os.environ.get("REDDIT_BATCH_MAX_SUBS", 50))      # upper bound on subreddits per listing
+REDDIT_BATCH_MAX_CHARS = int(os.environ.get("REDDIT_BATCH_MAX_CHARS", 400))   # keep the joined name URL-safe
+
+# Incremental fetching: per-source cursors (newest fullname already processed)
+REDDIT_BACKFILL_PAGES = int(os.environ.get("REDDIT_BACKFILL_PAGES", 3))             # 100-post pages fetched when a source fell behind
+REDDIT_CURSOR_VERIFY_EVERY = int(os.environ.get("REDDIT_CURSOR_VERIFY_EVERY", 5))   # empty cursor polls before a plain listing re-checks it
+
+# ---------- RSS fetch engine ----------
+RSS_FETCH_CONCURRENCY = int(os.environ.get("RSS_FETCH_CONCURRENCY", 20))  # feeds downloaded at once
+RSS_PER_HOST_LIMIT = int(os.environ.get("RSS_PER_HOST_LIMIT", 2))         # politeness: open connections per host
+RSS_FETCH_TIMEOUT = int(os.environ.get("RSS_FETCH_TIMEOUT", 20))          # seconds per feed request
+RSS_USER_AGENT = os.environ.get("RSS_USER_AGENT", "").strip() or "MultiNotify/1.7 (+https://github.com/ethanocurtis/MultiNotify)"  # blank = default
+
+# ---------- Webhook delivery ----------
+WEBHOOK_QUEUE_SIZE = int(os.environ.get("WEBHOOK_QUEUE_SIZE", 500))   # pending webhook posts before producers wait
+WEBHOOK_MAX_RETRIES = int(os.environ.get("WEBHOOK_MAX_RETRIES", 5))   # retries for network errors / 5xx, and for 429s
+WEBHOOK_TIMEOUT = int(os.environ.get("WEBHOOK_TIMEOUT", 10))          # seconds per webhook request
+WEBHOOK_BATCH_MAX = max(1, min(10, int(os.environ.get("WEBHOOK_BATCH_MAX", 10))))  # items per request (Discord allows 10 embeds)
+WEBHOOK_BATCH_LINGER = float(os.environ.get("WEBHOOK_BATCH_LINGER", 1.0))          # seconds to wait for more items of the same cycle
+
+# ---------- DM channel cache ----------
+DM_CACHE_SIZE = int(os.environ.get("DM_CACHE_SIZE", 5000))   # users whose DM channel is kept
+DM_CACHE_TTL = int(os.environ.get("DM_CACHE_TTL", 3600))     # seconds before a cached DM channel is re-resolved
+
+# ---------- Adaptive polling ----------
+ADAPTIVE_POLLING = os.environ.get("ADAPTIVE_POLLING", "false").lower() == "true"  # opt-in: changes the poll cadence
+SOURCE_MIN_INTERVAL = int(os.environ.get("SOURCE_MIN_INTERVAL", 60))    # busy sources polled this often (never above CHECK_INTERVAL)
+SOURCE_MAX_INTERVAL = int(os.environ.get("SOURCE_MAX_INTERVAL", 3600))  # quiet sources back off up to this
+
+# ---------- Quiet hours ----------
+QUIET_HOLD_LIMIT = int(os.environ.get("QUIET_HOLD_LIMIT", 100))  # Reddit posts held per user until their quiet hours end
+
+# ---------- Recent items (/why lookups) ----------
+RECENT_ITEMS_LIMIT = int(os.environ.get("RECENT_ITEMS_LIMIT", 5000))  # polled posts/entries kept for /why, /whyexpected, /whyglobal
+
+# ---------- Delivery queue ----------
+DELIVERY_WORKERS = int(os.environ.get("DELIVERY_WORKERS", 10))           # concurrent Discord senders (one destination each)
+DELIVERY_GLOBAL_RATE = float(os.environ.get("DELIVERY_GLOBAL_RATE", 40)) # sends/second across the bot (Discord global cap is 50)
+DELIVERY_ROUTE_RATE = float(os.environ.get("DELIVERY_ROUTE_RATE", 1))    # sends/second sustained per channel or DM
+DELIVERY_ROUTE_BURST = int(os.environ.get("DELIVERY_ROUTE_BURST", 5))    # sends a channel or DM may take back-to-back
+DELIVERY_MAX_ATTEMPTS = int(os.environ.get("DELIVERY_MAX_ATTEMPTS", 5))  # tries before a job is dead-lettered
+DELIVERY_DEAD_DAYS = int(os.environ.get("DELIVERY_DEAD_DAYS", 7))        # days dead-lettered jobs are kept (0 = forever)
+
+# ---------- State persistence ----------
+STATE_SAVE_DEBOUNCE = float(os.environ.get("STATE_SAVE_DEBOUNCE", 2))  # seconds changes to a state file are coalesced before writing
+
 # ---------- Clients ----------
 reddit = praw.Reddit(
     client_id=REDDIT_CLIENT_ID,
@@ -82,8 +164,14 @@ reddit = praw.Reddit(
     user_agent=REDDIT_USER_AGENT
 )
 
+class MultiNotifyClient(discord.Client):
+    async def close(self):
+        # client.run() calls this on shutdown; the aiohttp sessions would otherwise leak
+        await close_http_sessions()
+        await super().close()
+
 intents = discord.Intents.default()
-client = discord.Client(intents=intents)
+client = MultiNotifyClient(intents=intents)
 tree = app_commands.CommandTree(client)
 
 # === Reconnect-safe guards (fix duplicate background tasks & resyncs) ===
@@ -96,6 +184,15 @@ DATA_DIR = Path("/app/data")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 SEEN_PATH = DATA_DIR / "seen.json"
+SEEN_JOURNAL_PATH = DATA_DIR / "seen.journal"   # append-only JSON lines: ["<dest>", "<kind>", "<item_id>", <marked_ts>]
+SEEN_LIMIT = 5000                               # IDs kept per destination per kind
+SEEN_COMPACT_LINES = int(os.environ.get("SEEN_COMPACT_LINES", 50000))  # fold the journal into seen.json past this
+SEEN_RETENTION_DAYS = float(os.environ.get("SEEN_RETENTION_DAYS", 0))  # also forget IDs marked longer ago than this (0 = SEEN_LIMIT only)
+SEEN_HASHED = os.environ.get("SEEN_HASHED", "false").lower() == "true" # keep 64-bit hashes of seen IDs instead of the IDs (~11x less memory; JSON backend only)
+SEEN_BLOOM = os.environ.get("SEEN_BLOOM", "false").lower() == "true"   # Bloom filter answers "never seen" without an exact lookup
+
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "json").strip().lower()  # "json" (data/*.json files) or "sqlite" (data/state.db)
+STATE_DB_PATH = DATA_DIR / "state.db"
 
 def _load_json(path: Path, default):
     try:
@@ -103,101 +200,746 @@ def _load_json(path: Path, default):
     except Exception:
         return default
 
-def _ensure_seen_shape(d: dict) -> dict:
-    if not isinstance(d, dict):
-        d = {}
-    d.setdefault("global", {})
-    d["global"].setdefault("reddit", [])
-    d["global"].setdefault("rss", [])
-    d.setdefault("users", {})
-    for uid, rec in list(d["users"].items()):
-        if not isinstance(rec, dict):
-            d["users"][uid] = {"reddit": [], "rss": []}
-        else:
-            rec.setdefault("reddit", [])
-            rec.setdefault("rss", [])
-    return d
+def _atomic_write_text(path: Path, text: str):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
 
-def load_seen():
-    return _ensure_seen_shape(_load_json(SEEN_PATH, {}))
+def _compact_json(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"))
 
-def save_seen(seen):
+def _retire_json(path: Path):
     try:
-        SEEN_PATH.write_text(json.dumps(seen, indent=2), encoding="utf-8")
+        path.replace(path.with_name(path.name + ".migrated"))
     except Exception as e:
-        print(f"[ERROR] Saving seen.json: {e}")
+        print(f"[ERROR] Retiring {path.name}: {e}")
 
-_seen = load_seen()
+class StateDB:
+    """
+    SQLite (WAL) state store used when STATE_BACKEND=sqlite.
+
+    Seen IDs, prefs, digest items and thread mappings get indexed tables, so seen checks and
+    digest pops are point queries instead of whole files held in memory. The small documents
+    (routes, digest meta, cursors, feed validators) are stored whole in `docs`. Each
+    component imports its old JSON file the first time it loads and renames it to *.migrated.
+    The connection is shared with the state writer's thread, so every call takes the lock.
+    """
 
-def _prune_list(lst, limit=5000):
-    if len(lst) > limit:
-        del lst[:-limit]
+    def __init__(self, path: Path):
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " dest TEXT NOT NULL, kind TEXT NOT NULL, item_id TEXT NOT NULL, ts REAL NOT NULL,"
+            " PRIMARY KEY (dest, kind, item_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS seen_age ON seen(dest, kind, ts);"
+            "CREATE TABLE IF NOT EXISTS prefs (uid TEXT PRIMARY KEY, data TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS digest_items ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, uid TEXT NOT NULL, item TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS digest_items_uid ON digest_items(uid, id);"
+            "CREATE TABLE IF NOT EXISTS threads ("
+            " chan_id TEXT NOT NULL, key TEXT NOT NULL, thread_id TEXT NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (chan_id, key)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS docs (name TEXT PRIMARY KEY, body TEXT NOT NULL);"
+        )
 
-def get_global_seen(kind: str) -> set:
-    rec = _seen.get("global", {})
-    return set(rec.get(kind, []))
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def get_doc(self, name: str, default):
+        with self._lock:
+            row = self._db.execute("SELECT body FROM docs WHERE name=?", (name,)).fetchone()
+        try:
+            return json.loads(row[0]) if row else default
+        except Exception:
+            return default
+
+    def put_doc(self, name: str, body: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO docs (name, body) VALUES (?, ?)", (name, body))
+
+    def seen_has(self, dest: str, kind: str, item_id: str) -> bool:
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM seen WHERE dest=? AND kind=? AND item_id=?", (dest, kind, item_id)
+            ).fetchone() is not None
+
+    def seen_add(self, rows: list, cutoff: float = 0):
+        """
+        Insert (dest, kind, item_id, ts) rows, then trim each touched bucket to the newest
+        SEEN_LIMIT and drop its rows marked before `cutoff`.
+        """
+        with self._transaction() as db:
+            db.executemany("INSERT OR IGNORE INTO seen (dest, kind, item_id, ts) VALUES (?, ?, ?, ?)", rows)
+            for dest, kind in {(r[0], r[1]) for r in rows}:
+                db.execute(
+                    "DELETE FROM seen WHERE dest=? AND kind=? AND (ts < ? OR ts < ("
+                    " SELECT ts FROM seen WHERE dest=? AND kind=? ORDER BY ts DESC LIMIT 1 OFFSET ?))",
+                    (dest, kind, cutoff, dest, kind, SEEN_LIMIT - 1),
+                )
+
+    def seen_expire(self, cutoff: float) -> int:
+        with self._lock:
+            return self._db.execute("DELETE FROM seen WHERE ts < ?", (cutoff,)).rowcount
+
+    def seen_keys(self) -> list:
+        with self._lock:
+            return self._db.execute("SELECT dest, kind, item_id FROM seen").fetchall()
+
+    def load_prefs(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT uid, data FROM prefs").fetchall()
+        return {uid: json.loads(data) for uid, data in rows}
+
+    def save_prefs(self, rows: dict):
+        """Upsert {uid: prefs}; a None value deletes the user's row."""
+        with self._transaction() as db:
+            for uid, data in rows.items():
+                if data is None:
+                    db.execute("DELETE FROM prefs WHERE uid=?", (uid,))
+                else:
+                    db.execute("INSERT OR REPLACE INTO prefs (uid, data) VALUES (?, ?)", (uid, _compact_json(data)))
+
+    def add_digest_items(self, rows: list):
+        with self._transaction() as db:
+            db.executemany("INSERT INTO digest_items (uid, item) VALUES (?, ?)", rows)
+
+    def pop_digest_items(self, uid: str) -> list[str]:
+        with self._transaction() as db:
+            rows = db.execute("SELECT item FROM digest_items WHERE uid=? ORDER BY id", (uid,)).fetchall()
+            db.execute("DELETE FROM digest_items WHERE uid=?", (uid,))
+        return [r[0] for r in rows]
+
+    def load_threads(self) -> list:
+        with self._lock:
+            return self._db.execute("SELECT last_used, chan_id, key, thread_id FROM threads").fetchall()
+
+    def save_threads(self, rows: list):
+        with self._transaction() as db:
+            db.execute("DELETE FROM threads")
+            db.executemany("INSERT INTO threads (chan_id, key, thread_id, last_used) VALUES (?, ?, ?, ?)", rows)
+
+_state_db = StateDB(STATE_DB_PATH) if STATE_BACKEND == "sqlite" else None
+
+def _load_state_doc(name: str, path: Path, default):
+    """A whole-document state file: data/<file>.json, or the docs table with STATE_BACKEND=sqlite."""
+    if _state_db is None:
+        return _load_json(path, default)
+    if path.exists():
+        _state_db.put_doc(name, _compact_json(_load_json(path, default)))
+        _retire_json(path)
+    return _state_db.get_doc(name, default)
+
+class StateWriter:
+    """
+    Whole-file state documents (prefs, routes, cursors, caches, .env) written by one service.
+
+    mark() only flags a document dirty. The background flusher waits STATE_SAVE_DEBOUNCE
+    seconds so a burst of changes becomes one write, renders each dirty document once on
+    the event loop and hands it to a single writer thread, so writes land in render order.
+    Files are written as temp file + fsync + rename; with STATE_BACKEND=sqlite documents go
+    to state.db instead. The poll loops also flush at the end of every cycle.
+    """
+    __slots__ = ("_docs", "_dirty", "_stats", "_pool", "_wakeup")
+
+    def __init__(self):
+        self._docs: dict[str, tuple] = {}              # name -> (path, render() -> str, store(str))
+        self._dirty: set[str] = set()
+        self._stats: dict[str, dict] = {}              # name -> {"writes", "bytes", "failed"}
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state")
+        self._wakeup = asyncio.Event()
+
+    def register(self, name: str, path: Path, render, store=None):
+        if store is None:
+            store = partial(_state_db.put_doc, name) if _state_db else partial(_atomic_write_text, path)
+        self._docs[name] = (path, render, store)
+        self._stats.setdefault(name, {"writes": 0, "bytes": 0, "failed": 0})
+
+    def mark(self, name: str):
+        self._dirty.add(name)
+        self._wakeup.set()
+
+    def _render_dirty(self, names=None) -> list:
+        picked = self._dirty if names is None else self._dirty & set(names)
+        out = []
+        for name in sorted(picked):
+            self._dirty.discard(name)
+            path, render, _ = self._docs[name]
+            try:
+                out.append((name, render()))
+            except Exception as e:
+                self._stats[name]["failed"] += 1
+                print(f"[ERROR] Serializing {path.name}: {e}")
+        return out
+
+    def _write(self, name: str, text: str) -> bool:
+        path, _, store = self._docs[name]
+        try:
+            store(text)
+        except Exception as e:
+            self._stats[name]["failed"] += 1
+            print(f"[ERROR] Saving {path.name}: {e}")
+            return False
+        self._stats[name]["writes"] += 1
+        self._stats[name]["bytes"] += len(text.encode("utf-8"))
+        return True
+
+    def _submit_dirty(self, names=None) -> list:
+        # Queue each write as soon as it is rendered: the one writer thread runs them in
+        # submission order, so a newer copy from a later flush can never land first
+        return [(name, self._pool.submit(self._write, name, text)) for name, text in self._render_dirty(names)]
+
+    async def flush(self):
+        for name, fut in self._submit_dirty():
+            if not await asyncio.wrap_future(fut):
+                self._dirty.add(name)  # re-rendered and retried on the next flush
+
+    def flush_now(self, *names: str):
+        """Write dirty documents (all, or just `names`) synchronously, e.g. before a restart."""
+        for name, fut in self._submit_dirty(names or None):
+            if not fut.result():
+                self._dirty.add(name)
+
+    async def run(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(STATE_SAVE_DEBOUNCE)
+            self._wakeup.clear()
+            await self.flush()
+
+    def call(self, fn, *args):
+        """Run fn on the writer thread once every write queued so far has finished."""
+        return self._pool.submit(fn, *args).result()
+
+    def totals(self) -> dict:
+        return {
+            "writes": sum(st["writes"] for st in self._stats.values()),
+            "bytes": sum(st["bytes"] for st in self._stats.values()),
+            "failed": sum(st["failed"] for st in self._stats.values()),
+            "dirty": len(self._dirty),
+        }
+
+_state_writer = StateWriter()
+
+def _id_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+def _seen_cutoff() -> float:
+    return now_local().timestamp() - SEEN_RETENTION_DAYS * 86400 if SEEN_RETENTION_DAYS > 0 else 0
+
+class _IdBucket(OrderedDict):
+    """Seen IDs of one destination/kind, oldest first. Values are mark times, kept only with SEEN_RETENTION_DAYS."""
+    __slots__ = ()
+
+    def add(self, item_id: str, ts: int) -> bool:
+        if item_id in self:
+            return False
+        self[item_id] = ts if SEEN_RETENTION_DAYS > 0 else None
+        while len(self) > SEEN_LIMIT:
+            self.popitem(last=False)
+        return True
+
+    def trim(self, cutoff: float) -> int:
+        n = len(self)
+        while self:
+            ts = next(iter(self.values()))
+            if ts is None or ts >= cutoff:
+                break
+            self.popitem(last=False)
+        return n - len(self)
+
+    def hashes(self):
+        return map(_id_hash, self)
+
+    def entries(self) -> list:
+        return [item_id if ts is None else [item_id, ts] for item_id, ts in self.items()]
+
+class _HashedBucket:
+    """
+    Seen IDs of one destination/kind as sorted 64-bit hashes (bisect lookup) with parallel
+    uint32 mark times: 12 bytes per ID instead of a str plus an OrderedDict entry.
+    """
+    __slots__ = ("keys", "stamps")
+
+    def __init__(self):
+        self.keys = array("Q")
+        self.stamps = array("I")
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, item_id) -> bool:
+        return self.has_hash(_id_hash(item_id))
+
+    def has_hash(self, h: int) -> bool:
+        i = bisect_left(self.keys, h)
+        return i < len(self.keys) and self.keys[i] == h
+
+    def add(self, item_id, ts: int) -> bool:
+        h = item_id if isinstance(item_id, int) else _id_hash(item_id)
+        i = bisect_left(self.keys, h)
+        if i < len(self.keys) and self.keys[i] == h:
+            return False
+        # array.insert shifts the tail, so an add is O(n); n stays under SEEN_LIMIT * 1.1, a
+        # memmove of a few dozen KB at most, which is cheap next to the delivery it records
+        self.keys.insert(i, h)
+        self.stamps.insert(i, ts)
+        if len(self.keys) > SEEN_LIMIT + SEEN_LIMIT // 10:
+            # Evict the oldest in one pass per 10% overshoot rather than on every add
+            newest = sorted(range(len(self.stamps)), key=self.stamps.__getitem__)[-SEEN_LIMIT:]
+            self._keep(sorted(newest))
+        return True
+
+    def _keep(self, idx: list):
+        self.keys = array("Q", [self.keys[i] for i in idx])
+        self.stamps = array("I", [self.stamps[i] for i in idx])
+
+    def trim(self, cutoff: float) -> int:
+        n = len(self.keys)
+        if not n or min(self.stamps) >= cutoff:
+            return 0
+        self._keep([i for i, ts in enumerate(self.stamps) if ts >= cutoff])
+        return n - len(self.keys)
+
+    def hashes(self):
+        return iter(self.keys)
+
+    def entries(self) -> list:
+        return [[h, ts] for ts, h in sorted(zip(self.stamps, self.keys))]
+
+class _SeenBloom:
+    """
+    Bloom filter over (destination, kind, item hash), 4 probes. A miss means "definitely not
+    seen" and skips the exact lookup; a hit still goes to the store, since treating a false
+    positive as seen would silently drop a notification. Sized for twice the keys it was
+    built with (>= 10 bits per key until full(), about 1% false positives at worst).
+    """
+    __slots__ = ("_bits", "_mask", "_salts", "count", "capacity")
+
+    def __init__(self, keys: int):
+        self.capacity = max(2 * keys, 1 << 16)
+        m = 1 << (self.capacity * 10 - 1).bit_length()
+        self._bits = bytearray(m >> 3)
+        self._mask = m - 1
+        self._salts: dict[tuple[str, str], int] = {}
+        self.count = 0
+
+    def _probes(self, dest: str, kind: str, h: int):
+        salt = self._salts.get((dest, kind))
+        if salt is None:
+            salt = self._salts[(dest, kind)] = _id_hash(f"{dest}\0{kind}")
+        key = h ^ salt
+        h1, h2, mask = key & 0xFFFFFFFF, (key >> 32) | 1, self._mask
+        return ((h1 + i * h2) & mask for i in range(4))
+
+    def add(self, dest: str, kind: str, h: int):
+        bits = self._bits
+        for pos in self._probes(dest, kind, h):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, dest: str, kind: str, h: int) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._probes(dest, kind, h))
+
+    def full(self) -> bool:
+        return self.count > self.capacity
+
+class _SeenView:
+    __slots__ = ("_store", "_dest", "_kind")
+
+    def __init__(self, store, dest: str, kind: str):
+        self._store, self._dest, self._kind = store, dest, kind
+
+    def __contains__(self, item_id) -> bool:
+        return self._store.has(self._dest, self._kind, item_id)
+
+class SeenStore:
+    """
+    Seen item IDs per destination ("global" or a user ID) and kind ("reddit"/"rss").
+
+    Membership is O(1) (insertion-ordered dicts, oldest evicted past SEEN_LIMIT), or a
+    bisect over sorted 64-bit hashes with SEEN_HASHED. With SEEN_RETENTION_DAYS, IDs marked
+    longer ago are also dropped (checked hourly); with SEEN_BLOOM, a Bloom filter answers
+    most "not seen" checks first.
+    Marks are buffered in memory and appended to seen.journal by flush(), normally
+    once per poll cycle; the journal is folded into the seen.json snapshot once it
+    grows past SEEN_COMPACT_LINES.
+    """
+    __slots__ = ("_data", "_pending", "_journal_lines", "_hashed", "_bloom", "_next_trim")
+
+    def __init__(self, hashed: bool = False):
+        self._data: dict[str, dict] = {}
+        self._pending: list[str] = []
+        self._journal_lines = 0
+        self._hashed = hashed
+        self._bloom: _SeenBloom | None = None
+        self._next_trim = 0.0
+
+    def _bucket(self, dest: str, kind: str):
+        rec = self._data.get(dest)
+        if rec is None:
+            rec = self._data[dest] = {}
+        bucket = rec.get(kind)
+        if bucket is None:
+            bucket = rec[kind] = _HashedBucket() if self._hashed else _IdBucket()
+        return bucket
+
+    def view(self, dest: str, kind: str):
+        return self._bucket(dest, kind) if self._bloom is None else _SeenView(self, dest, kind)
+
+    def has(self, dest: str, kind: str, item_id: str) -> bool:
+        h = _id_hash(item_id)
+        if not self._bloom.might_contain(dest, kind, h):
+            return False
+        bucket = self._bucket(dest, kind)
+        return bucket.has_hash(h) if self._hashed else item_id in bucket
+
+    def add(self, dest: str, kind: str, item_id, persist: bool = True, ts: int | None = None) -> bool:
+        ts = int(now_local().timestamp()) if ts is None else ts
+        if not self._bucket(dest, kind).add(item_id, ts):
+            return False
+        if self._bloom is not None:
+            self._bloom.add(dest, kind, item_id if isinstance(item_id, int) else _id_hash(item_id))
+            if self._bloom.full():
+                self._rebuild_bloom()
+        if persist:
+            self._pending.append(json.dumps([dest, kind, item_id, ts]) + "\n")
+        return True
+
+    def _rebuild_bloom(self):
+        bloom = _SeenBloom(sum(len(b) for rec in self._data.values() for b in rec.values()))
+        for dest, rec in self._data.items():
+            for kind, bucket in rec.items():
+                for h in bucket.hashes():
+                    bloom.add(dest, kind, h)
+        self._bloom = bloom
+
+    def snapshot(self) -> dict:
+        # Same document shape seen.json has always had; entries are "<id>", or [id_or_hash, marked_ts]
+        out = {"global": {"reddit": [], "rss": []}, "users": {}}
+        for dest, rec in self._data.items():
+            lists = {kind: bucket.entries() for kind, bucket in rec.items()}
+            if dest == "global":
+                out["global"].update(lists)
+            else:
+                out["users"][dest] = lists
+        return out
+
+    def _load_entries(self, dest: str, kind: str, entries: list, base: int) -> int:
+        skipped = 0
+        for i, entry in enumerate(entries):
+            item_id, ts = entry if isinstance(entry, list) else (entry, base - len(entries) + i)
+            if isinstance(item_id, int) and not self._hashed:
+                skipped += 1  # written with SEEN_HASHED=true; the ID itself is gone
+                continue
+            self.add(dest, kind, item_id, persist=False, ts=int(ts))
+        return skipped
+
+    def load(self):
+        d = _load_json(SEEN_PATH, {})
+        if not isinstance(d, dict):
+            d = {}
+        base = int(now_local().timestamp())
+        skipped = 0
+        for kind, entries in (d.get("global") or {}).items():
+            skipped += self._load_entries("global", kind, entries or [], base)
+        for uid, rec in (d.get("users") or {}).items():
+            if not isinstance(rec, dict):
+                continue
+            for kind, entries in rec.items():
+                skipped += self._load_entries(str(uid), kind, entries or [], base)
+        if skipped:
+            print(f"[WARN] Ignored {skipped} hashed seen IDs from seen.json (written with SEEN_HASHED=true)")
+        try:
+            with open(SEEN_JOURNAL_PATH, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        dest, kind, item_id, *ts = json.loads(line)
+                    except Exception:
+                        continue  # torn last line after a crash
+                    self.add(dest, kind, item_id, persist=False, ts=int(ts[0]) if ts else base)
+                    self._journal_lines += 1
+        except FileNotFoundError:
+            pass
+        self.trim()
+        if SEEN_BLOOM:
+            self._rebuild_bloom()
+
+    def trim(self):
+        """Drop IDs past SEEN_RETENTION_DAYS; flush() calls this hourly."""
+        self._next_trim = now_local().timestamp() + 3600
+        cutoff = _seen_cutoff()
+        if not cutoff:
+            return
+        dropped = sum(bucket.trim(cutoff) for rec in self._data.values() for bucket in rec.values())
+        if dropped and self._bloom is not None:
+            self._rebuild_bloom()
+
+    def flush(self) -> bool:
+        if now_local().timestamp() >= self._next_trim:
+            self.trim()
+        if not self._pending:
+            return True
+        lines, self._pending = self._pending, []
+        try:
+            with open(SEEN_JOURNAL_PATH, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            self._journal_lines += len(lines)
+            if self._journal_lines > SEEN_COMPACT_LINES:
+                self.compact()
+        except Exception as e:
+            print(f"[ERROR] Saving seen journal: {e}")
+            return False
+        return True
+
+    def compact(self):
+        try:
+            _atomic_write_text(SEEN_PATH, json.dumps(self.snapshot()))
+            open(SEEN_JOURNAL_PATH, "w", encoding="utf-8").close()
+            self._journal_lines = 0
+        except Exception as e:
+            print(f"[ERROR] Saving seen.json: {e}")
+
+class SqliteSeenStore:
+    """
+    SeenStore over state.db (STATE_BACKEND=sqlite). Nothing is held in memory but the
+    marks of the current cycle (and the Bloom filter with SEEN_BLOOM): membership is a
+    primary-key lookup, and flush() inserts the buffered marks and trims each touched
+    bucket to SEEN_LIMIT and SEEN_RETENTION_DAYS in one transaction.
+    """
+    __slots__ = ("_db", "_pending", "_pending_keys", "_bloom")
+
+    def __init__(self, db: StateDB):
+        self._db = db
+        self._pending: list[tuple] = []
+        self._pending_keys: set[tuple] = set()
+        self._bloom: _SeenBloom | None = None
+
+    def view(self, dest: str, kind: str):
+        return _SeenView(self, dest, kind)
+
+    def has(self, dest: str, kind: str, item_id: str) -> bool:
+        if (dest, kind, item_id) in self._pending_keys:
+            return True
+        if self._bloom is not None and not self._bloom.might_contain(dest, kind, _id_hash(item_id)):
+            return False
+        return self._db.seen_has(dest, kind, item_id)
+
+    def add(self, dest: str, kind: str, item_id: str, persist: bool = True) -> bool:
+        key = (dest, kind, item_id)
+        if key in self._pending_keys:
+            return False
+        self._pending_keys.add(key)
+        self._pending.append((dest, kind, item_id, now_local().timestamp()))
+        if self._bloom is not None:
+            self._bloom.add(dest, kind, _id_hash(item_id))
+        return True
+
+    def _rebuild_bloom(self):
+        rows = self._db.seen_keys()
+        bloom = _SeenBloom(len(rows))
+        for dest, kind, item_id in rows:
+            bloom.add(dest, kind, _id_hash(item_id))
+        self._bloom = bloom
+
+    def load(self):
+        if SEEN_PATH.exists() or SEEN_JOURNAL_PATH.exists():
+            self._import_json()
+        cutoff = _seen_cutoff()
+        if cutoff:
+            self._db.seen_expire(cutoff)
+        if SEEN_BLOOM:
+            self._rebuild_bloom()
+
+    def _import_json(self):
+        # One-time import of seen.json + seen.journal, keeping each bucket's order
+        legacy = SeenStore()
+        legacy.load()
+        base = now_local().timestamp()
+        rows = []
+        for dest, rec in legacy._data.items():
+            for kind, bucket in rec.items():
+                n = len(bucket)
+                rows.extend(
+                    (dest, kind, item_id, base - n + i if ts is None else ts)
+                    for i, (item_id, ts) in enumerate(bucket.items())
+                )
+        try:
+            self._db.seen_add(rows)
+        except Exception as e:
+            print(f"[ERROR] Importing seen.json: {e}")
+            return
+        for path in (SEEN_PATH, SEEN_JOURNAL_PATH):
+            if path.exists():
+                _retire_json(path)
+
+    def flush(self) -> bool:
+        if not self._pending:
+            return True
+        rows, self._pending = self._pending, []
+        self._pending_keys.clear()
+        try:
+            self._db.seen_add(rows, _seen_cutoff())
+        except Exception as e:
+            print(f"[ERROR] Saving seen IDs: {e}")
+            return False
+        finally:
+            if self._bloom is not None and self._bloom.full():
+                self._rebuild_bloom()
+        return True
+
+_seen = SqliteSeenStore(_state_db) if _state_db else SeenStore(hashed=SEEN_HASHED)
+_seen.load()
+
+# Seen IDs (and digest entries) recorded since the last DeliveryQueue.commit(), which writes
+# them in the same transaction as the deliveries they belong to
+_unsaved_marks: list[tuple] = []  # (scope, kind, value)
+
+def flush_seen() -> bool:
+    return _seen.flush()
+
+def get_global_seen(kind: str):
+    return _seen.view("global", kind)
 
 def mark_global_seen(kind: str, item_id: str):
-    rec = _seen.setdefault("global", {})
-    arr = rec.setdefault(kind, [])
-    if item_id not in arr:
-        arr.append(item_id)
-        _prune_list(arr)
-        save_seen(_seen)
+    _seen.add("global", kind, item_id)
+    _unsaved_marks.append(("global", kind, item_id))
 
-def get_user_seen(uid: int, kind: str) -> set:
-    urec = _seen.setdefault("users", {}).setdefault(str(uid), {"reddit": [], "rss": []})
-    return set(urec.get(kind, []))
+def get_user_seen(uid: int, kind: str):
+    return _seen.view(str(uid), kind)
 
 def mark_user_seen(uid: int, kind: str, item_id: str):
-    urec = _seen.setdefault("users", {}).setdefault(str(uid), {"reddit": [], "rss": []})
-    arr = urec.setdefault(kind, [])
-    if item_id not in arr:
-        arr.append(item_id)
-        _prune_list(arr)
-        save_seen(_seen)
+    _seen.add(str(uid), kind, item_id)
+    _unsaved_marks.append((str(uid), kind, item_id))
 
 # ---------- NEW: Thread cache ----------
-THREAD_CACHE_PATH = DATA_DIR / "thread_cache.json"
-_thread_cache = _load_json(THREAD_CACHE_PATH, {}) if THREAD_CACHE_PATH.exists() else {}
-if not isinstance(_thread_cache, dict):
-    _thread_cache = {}
+THREAD_CACHE_PATH = DATA_DIR / "thread_cache.json"  # { channel_id: { thread_key: {"thread_id", "last_used"} } }
+THREAD_CACHE_SAVE_INTERVAL = 60                     # seconds between background prune + save passes
 
-def _save_thread_cache():
-    try:
-        THREAD_CACHE_PATH.write_text(json.dumps(_thread_cache, indent=2), encoding="utf-8")
-    except Exception as e:
-        print(f"[ERROR] Saving thread_cache.json: {e}")
-
-def _thread_cache_prune():
-    # Remove old entries based on THREAD_TTL_HOURS
-    try:
-        ttl_seconds = max(1, THREAD_TTL_HOURS) * 3600
-        now_ts = now_local().timestamp()
-        changed = False
-        for chan_id, mapping in list(_thread_cache.items()):
+class ThreadCache:
+    """
+    Reusable thread per (channel, thread key), kept in least-recently-used order so expiry
+    only looks at the oldest entries. Reuse just bumps the entry in memory; the file is
+    rewritten by the background maintenance pass (new/dropped threads are queued for the
+    state writer right away).
+    Resolved discord.Thread objects are kept so reuse doesn't hit fetch_channel.
+    """
+    __slots__ = ("_entries", "_threads", "_dirty")
+
+    def __init__(self):
+        self._entries: OrderedDict = OrderedDict()  # (chan_id, key) -> [thread_id, last_used_ts]
+        self._threads: dict[str, discord.Thread] = {}
+        self._dirty = False
+
+    def load(self):
+        if _state_db is not None and not THREAD_CACHE_PATH.exists():
+            for ts, chan_id, key, tid in sorted(_state_db.load_threads()):
+                self._entries[(chan_id, key)] = [tid, ts]
+            return
+        data = _load_json(THREAD_CACHE_PATH, {}) if THREAD_CACHE_PATH.exists() else {}
+        rows = []
+        for chan_id, mapping in (data.items() if isinstance(data, dict) else []):
             if not isinstance(mapping, dict):
-                del _thread_cache[chan_id]
-                changed = True
                 continue
-            for key, rec in list(mapping.items()):
+            for key, rec in mapping.items():
                 try:
-                    last_used = rec.get("last_used", "")
-                    last_dt = datetime.fromisoformat(last_used)
-                    if (now_ts - last_dt.replace(tzinfo=TZ).timestamp()) > ttl_seconds:
-                        del mapping[key]
-                        changed = True
+                    last_dt = datetime.fromisoformat(rec["last_used"])
+                    if last_dt.tzinfo is None:
+                        last_dt = last_dt.replace(tzinfo=TZ)
+                    rows.append((last_dt.timestamp(), str(chan_id), key, str(rec["thread_id"])))
                 except Exception:
-                    # bad record; drop it
-                    del mapping[key]
-                    changed = True
-            if not mapping:
-                del _thread_cache[chan_id]
-                changed = True
-        if changed:
-            _save_thread_cache()
-    except Exception:
-        pass
+                    continue  # bad record; drop it
+        for ts, chan_id, key, tid in sorted(rows):
+            self._entries[(chan_id, key)] = [tid, ts]
+        if _state_db is not None:
+            _retire_json(THREAD_CACHE_PATH)  # one-time import; save() puts the rows in state.db
+            self.save()
+
+    def render(self) -> str:
+        if _state_db is not None:
+            return _compact_json([[chan_id, key, tid, ts] for (chan_id, key), (tid, ts) in self._entries.items()])
+        out: dict[str, dict] = {}
+        for (chan_id, key), (tid, ts) in self._entries.items():
+            out.setdefault(chan_id, {})[key] = {
+                "thread_id": tid,
+                "last_used": datetime.fromtimestamp(ts, TZ).isoformat(timespec="seconds"),
+            }
+        return _compact_json(out)
+
+    def save(self):
+        self._dirty = False
+        _state_writer.mark("thread_cache")
+
+    def get(self, chan_id: str, key: str) -> str | None:
+        rec = self._entries.get((chan_id, key))
+        return rec[0] if rec else None
+
+    def touch(self, chan_id: str, key: str):
+        rec = self._entries.get((chan_id, key))
+        if rec:
+            rec[1] = now_local().timestamp()
+            self._entries.move_to_end((chan_id, key))
+            self._dirty = True
+
+    def put(self, chan_id: str, key: str, thread: discord.Thread):
+        self._entries[(chan_id, key)] = [str(thread.id), now_local().timestamp()]
+        self._entries.move_to_end((chan_id, key))
+        self._threads[str(thread.id)] = thread
+        self.save()
+
+    def drop(self, chan_id: str, key: str):
+        rec = self._entries.pop((chan_id, key), None)
+        if rec:
+            self._threads.pop(rec[0], None)
+            self.save()
+
+    def thread(self, thread_id: str) -> discord.Thread | None:
+        return self._threads.get(thread_id)
+
+    def remember(self, thread: discord.Thread):
+        self._threads[str(thread.id)] = thread
+
+    def prune(self):
+        # Remove old entries based on THREAD_TTL_HOURS; oldest first, stop at the first live one
+        cutoff = now_local().timestamp() - max(1, THREAD_TTL_HOURS) * 3600
+        while self._entries:
+            key, (tid, ts) = next(iter(self._entries.items()))
+            if ts > cutoff:
+                break
+            del self._entries[key]
+            self._threads.pop(tid, None)
+            self._dirty = True
+
+    def maintain(self):
+        self.prune()
+        if self._dirty:
+            self.save()
+
+_thread_cache = ThreadCache()
+_thread_cache.load()
+_state_writer.register(
+    "thread_cache", THREAD_CACHE_PATH, _thread_cache.render,
+    (lambda text: _state_db.save_threads(json.loads(text))) if _state_db else None,
+)
+
+async def thread_cache_maintenance():
+    while True:
+        await asyncio.sleep(THREAD_CACHE_SAVE_INTERVAL)
+        _thread_cache.maintain()
 
 async def _send_to_channel_threaded(channel: discord.abc.Messageable, thread_key: str, thread_name: str, embed: discord.Embed):
     """
@@ -216,34 +958,24 @@ async def _send_to_channel_threaded(channel: discord.abc.Messageable, thread_key
         await channel.send(embed=embed)
         return
 
-    _thread_cache_prune()
-
     chan_id = str(channel.id)
-    mapping = _thread_cache.setdefault(chan_id, {})
-    rec = mapping.get(thread_key)
+    tid = _thread_cache.get(chan_id, thread_key)
 
     # Try cached thread first
-    if isinstance(rec, dict):
-        tid = rec.get("thread_id")
-        if tid:
-            try:
-                th = client.get_channel(int(tid))
-                if th is None:
-                    th = await client.fetch_channel(int(tid))
-                if isinstance(th, discord.Thread):
-                    # update last used
-                    rec["last_used"] = now_local().isoformat(timespec="seconds")
-                    mapping[thread_key] = rec
-                    _save_thread_cache()
-                    await th.send(embed=embed)
-                    return
-            except Exception:
-                # cached thread invalid; drop it
-                try:
-                    del mapping[thread_key]
-                    _save_thread_cache()
-                except Exception:
-                    pass
+    if tid:
+        try:
+            th = _thread_cache.thread(tid) or client.get_channel(int(tid))
+            if th is None:
+                th = await client.fetch_channel(int(tid))
+            if isinstance(th, discord.Thread):
+                _thread_cache.remember(th)
+                _thread_cache.touch(chan_id, thread_key)
+                await th.send(embed=embed)
+                return
+        except Exception:
+            pass
+        # cached thread invalid (deleted/archived/no access); drop it
+        _thread_cache.drop(chan_id, thread_key)
 
     # Create new thread
     try:
@@ -253,8 +985,7 @@ async def _send_to_channel_threaded(channel: discord.abc.Messageable, thread_key
 
         starter = await channel.send(content=f"Thread created for: **{safe_name}**")
         th = await channel.create_thread(name=safe_name, message=starter, auto_archive_duration=1440)
-        mapping[thread_key] = {"thread_id": str(th.id), "last_used": now_local().isoformat(timespec="seconds")}
-        _save_thread_cache()
+        _thread_cache.put(chan_id, thread_key, th)
         await th.send(embed=embed)
         return
     except Exception as e:
@@ -268,11 +999,21 @@ RSS_ICON = "https://upload.wikimedia.org/wikipedia/commons/thumb/4/43/Feed-icon.
 
 # ---------- User prefs ----------
 PREFS_PATH = DATA_DIR / "user_prefs.json"  # { "1234567890": { ... }, ... }
-user_prefs = _load_json(PREFS_PATH, {})
+
+def _load_prefs() -> dict:
+    if _state_db is None:
+        return _load_json(PREFS_PATH, {})
+    if PREFS_PATH.exists():
+        legacy = _load_json(PREFS_PATH, {})
+        _state_db.save_prefs({str(uid): rec for uid, rec in legacy.items()} if isinstance(legacy, dict) else {})
+        _retire_json(PREFS_PATH)
+    return _state_db.load_prefs()
+
+user_prefs = _load_prefs()
 
 # ---------- Global keyword routes (admin-managed) ----------
 GLOBAL_ROUTES_PATH = DATA_DIR / "global_keyword_routes.json"
-global_keyword_routes = _load_json(GLOBAL_ROUTES_PATH, {"reddit": {}, "rss": {}})
+global_keyword_routes = _load_state_doc("global_routes", GLOBAL_ROUTES_PATH, {"reddit": {}, "rss": {}})
 
 def _ensure_global_routes_shape(d):
     if not isinstance(d, dict):
@@ -290,16 +1031,15 @@ def _ensure_global_routes_shape(d):
 global_keyword_routes = _ensure_global_routes_shape(global_keyword_routes)
 
 def save_global_routes():
-    try:
-        GLOBAL_ROUTES_PATH.write_text(json.dumps(global_keyword_routes, indent=2), encoding="utf-8")
-    except Exception as e:
-        print(f"[ERROR] Saving global routes: {e}")
+    _state_writer.mark("global_routes")
+
+_state_writer.register("global_routes", GLOBAL_ROUTES_PATH, lambda: _compact_json(global_keyword_routes))
 
 
 
 # ---------- Global flair routes (admin-managed, Reddit only) ----------
 GLOBAL_FLAIR_ROUTES_PATH = DATA_DIR / "global_flair_routes.json"
-global_flair_routes = _load_json(GLOBAL_FLAIR_ROUTES_PATH, {})  # { "flair_text_lower": "channel_id" }
+global_flair_routes = _load_state_doc("global_flair_routes", GLOBAL_FLAIR_ROUTES_PATH, {})  # { "flair_text_lower": "channel_id" }
 
 def _ensure_global_flair_routes_shape(d):
     if not isinstance(d, dict):
@@ -316,18 +1056,34 @@ def _ensure_global_flair_routes_shape(d):
 global_flair_routes = _ensure_global_flair_routes_shape(global_flair_routes)
 
 def save_global_flair_routes():
-    try:
-        GLOBAL_FLAIR_ROUTES_PATH.write_text(json.dumps(global_flair_routes, indent=2), encoding="utf-8")
-    except Exception as e:
-        print(f"[ERROR] Saving global flair routes: {e}")
+    _state_writer.mark("global_flair_routes")
+
+_state_writer.register("global_flair_routes", GLOBAL_FLAIR_ROUTES_PATH, lambda: _compact_json(global_flair_routes))
+
+
 
+_dirty_pref_uids: set[str] = set()  # STATE_BACKEND=sqlite: users whose prefs row is rewritten on the next flush
 
+def save_prefs(uid):
+    _dirty_pref_uids.add(str(uid))
+    _state_writer.mark("prefs")
 
-def save_prefs():
+def _render_prefs() -> str:
+    if _state_db is None:
+        return _compact_json(user_prefs)
+    rows = {uid: user_prefs.get(uid) for uid in _dirty_pref_uids}
+    _dirty_pref_uids.clear()
+    return _compact_json(rows)
+
+def _store_pref_rows(text: str):
+    rows = json.loads(text)
     try:
-        PREFS_PATH.write_text(json.dumps(user_prefs, indent=2), encoding="utf-8")
-    except Exception as e:
-        print(f"[ERROR] Saving prefs: {e}")
+        _state_db.save_prefs(rows)
+    except Exception:
+        _dirty_pref_uids.update(rows)  # picked up again when the flush is retried
+        raise
+
+_state_writer.register("prefs", PREFS_PATH, _render_prefs, _store_pref_rows if _state_db else None)
 
 def _norm_sub(name: str) -> str:
     name = (name or "").strip().lower()
@@ -335,8 +1091,7 @@ def _norm_sub(name: str) -> str:
         name = name[2:]
     return name
 
-def get_user_prefs(uid: int):
-    uid = str(uid)
+def _merge_user_prefs(uid: str) -> dict:
     base = {
         # CHANGED: default personal DMs are OFF (no “surprise” DMs)
         "enable_dm": False,
@@ -384,125 +1139,482 @@ def get_user_prefs(uid: int):
     p["digest_day"] = day
     return p
 
+def _parse_quiet_hours(q) -> tuple[time, time] | None:
+    if not q:
+        return None
+    try:
+        sH, sM = map(int, q["start"].split(":"))
+        eH, eM = map(int, q["end"].split(":"))
+        return time(sH, sM), time(eH, eM)
+    except Exception:
+        return None
+
+class UserPrefs:
+    """
+    Materialized, normalized preferences for one user, cached until set_user_pref()
+    writes. Hot paths read attributes; `data` is the merged dict get_user_prefs()
+    hands to commands.
+    """
+    __slots__ = (
+        "uid", "data", "enable_dm", "digest", "digest_time", "digest_day", "preferred_channel_id",
+        "subreddits", "flairs", "feeds", "watched_users", "quiet", "reddit_kw", "rss_kw",
+        "watch_bypass_subs", "watch_bypass_flairs", "watch_bypass_keywords", "keyword_routes",
+    )
+
+    def __init__(self, uid: str, data: dict):
+        self.uid = uid
+        self.data = data
+        self.enable_dm = bool(data.get("enable_dm"))
+        self.digest = data.get("digest") or "off"
+        self.digest_time = data.get("digest_time") or "09:00"
+        self.digest_day = data["digest_day"]
+        self.preferred_channel_id = data.get("preferred_channel_id")
+        self.subreddits = frozenset(data["subreddits"])
+        self.flairs = frozenset(data.get("reddit_flairs") or ())
+        self.feeds = frozenset(u.strip() for u in data.get("feeds") or () if u and u.strip())
+        self.watched_users = frozenset(u.strip().lstrip("u/") for u in data.get("watched_users") or () if u and u.strip())
+        self.quiet = _parse_quiet_hours(data.get("quiet_hours"))
+        # None means "no filter" (ALL)
+        self.reddit_kw = keyword_matcher(data["reddit_keywords"]) if data.get("reddit_keywords") else None
+        self.rss_kw = keyword_matcher(data["rss_keywords"]) if data.get("rss_keywords") else None
+        self.watch_bypass_subs = data.get("watch_bypass_subs", True)
+        self.watch_bypass_flairs = data.get("watch_bypass_flairs", True)
+        self.watch_bypass_keywords = data.get("watch_bypass_keywords", False)
+        self.keyword_routes = data["keyword_routes"]
+
+    def quiet_now(self) -> bool:
+        if self.quiet is None:
+            return False
+        start, end = self.quiet
+        now_t = now_local().time()
+        return (start <= now_t < end) if start < end else (now_t >= start or now_t < end)
+
+_prefs_cache: dict[str, UserPrefs] = {}
+
+def get_user_record(uid: int) -> UserPrefs:
+    uid = str(uid)
+    rec = _prefs_cache.get(uid)
+    if rec is None:
+        rec = _prefs_cache[uid] = UserPrefs(uid, _merge_user_prefs(uid))
+    return rec
+
+def get_user_prefs(uid: int):
+    return dict(get_user_record(uid).data)
+
+
 def set_user_pref(uid: int, key: str, value):
     uid = str(uid)
     cur = user_prefs.get(uid, {})
     cur[key] = value
     user_prefs[uid] = cur
-    save_prefs()
+    save_prefs(uid)
+    _prefs_cache.pop(uid, None)
+    _sub_index.update_user(uid, cur)
+    if key in ("digest", "digest_time", "digest_day"):
+        schedule_digest(uid)
+
+# ---------- Subscription index ----------
+class SubscriptionIndex:
+    """
+    Inverted index of personal subscriptions so each item only visits subscribed users:
+    subreddit -> uids, feed URL -> uids, watched author -> uids. Users without a
+    /mysubs list follow the global subreddit and live in `default_sub_users`.
+    Maintained per user from set_user_pref(); uids are the user_prefs keys (str).
+    """
+    __slots__ = ("subs", "feeds", "authors", "default_sub_users", "_by_user")
+
+    def __init__(self):
+        self.subs: dict[str, set[str]] = {}
+        self.feeds: dict[str, set[str]] = {}
+        self.authors: dict[str, set[str]] = {}
+        self.default_sub_users: set[str] = set()
+        self._by_user: dict[str, tuple[set, set, set]] = {}
+
+    @staticmethod
+    def _remove(index: dict, keys, uid: str):
+        for k in keys:
+            users = index.get(k)
+            if users is not None:
+                users.discard(uid)
+                if not users:
+                    del index[k]
+
+    def remove_user(self, uid: str):
+        old = self._by_user.pop(uid, None)
+        if old:
+            self._remove(self.subs, old[0], uid)
+            self._remove(self.feeds, old[1], uid)
+            self._remove(self.authors, old[2], uid)
+        self.default_sub_users.discard(uid)
+
+    def update_user(self, uid: str, prefs: dict):
+        self.remove_user(uid)
+        subs = {_norm_sub(s) for s in prefs.get("subreddits", []) or [] if _norm_sub(s)}
+        feeds = {u.strip() for u in prefs.get("feeds", []) or [] if u and u.strip()}
+        authors = {u.strip().lstrip("u/") for u in prefs.get("watched_users", []) or [] if u and u.strip()}
+        for k in subs:
+            self.subs.setdefault(k, set()).add(uid)
+        for k in feeds:
+            self.feeds.setdefault(k, set()).add(uid)
+        for k in authors:
+            self.authors.setdefault(k, set()).add(uid)
+        if not subs:
+            self.default_sub_users.add(uid)
+        self._by_user[uid] = (subs, feeds, authors)
+
+    def rebuild(self, prefs_map: dict):
+        self.__init__()
+        for uid, prefs in prefs_map.items():
+            self.update_user(str(uid), prefs if isinstance(prefs, dict) else {})
+
+    # Lookups return copies: delivery loops await sends while commands may edit the index.
+    def users_for_subreddit(self, sub_name: str) -> set[str]:
+        users = set(self.subs.get(sub_name, ()))
+        if SUBREDDIT and sub_name == _norm_sub(SUBREDDIT):
+            users |= self.default_sub_users
+        return users
+
+    def users_for_feed(self, feed_url: str) -> set[str]:
+        return set(self.feeds.get(feed_url, ()))
+
+    def users_for_author(self, author: str) -> set[str]:
+        # Globally watched authors go to every user; personal watches only to their owners
+        if author in WATCH_USERS:
+            return set(self._by_user)
+        return set(self.authors.get(author, ()))
+
+_sub_index = SubscriptionIndex()
+_sub_index.rebuild(user_prefs)
 
 def is_quiet_now(uid: int):
-    q = get_user_prefs(uid).get("quiet_hours")
-    if not q:
-        return False
-    try:
-        sH, sM = map(int, q["start"].split(":"))
-        eH, eM = map(int, q["end"].split(":"))
-        now_t = now_local().time()
-        start, end = time(sH, sM), time(eH, eM)
-        return (start <= now_t < end) if start < end else (now_t >= start or now_t < end)
-    except Exception:
-        return False
+    return get_user_record(uid).quiet_now()
+
+# Reddit cursors move past posts whether or not everyone could take them, so posts skipped
+# for quiet hours are held per user (newest QUIET_HOLD_LIMIT) and offered again afterwards.
+_quiet_holds: dict[int, OrderedDict] = {}  # uid -> {post id: submission}, oldest first
+
+def hold_for_quiet_hours(uid: int, post):
+    held = _quiet_holds.setdefault(uid, OrderedDict())
+    held[post.id] = post
+    while len(held) > max(1, QUIET_HOLD_LIMIT):
+        held.popitem(last=False)
+
+def release_quiet_holds() -> list:
+    """Held posts of users whose quiet hours have ended, newest first; their holds are cleared."""
+    posts = {}
+    for uid in [uid for uid in _quiet_holds if not is_quiet_now(uid)]:
+        for post in _quiet_holds.pop(uid).values():
+            posts[post.id] = post
+    return sorted(posts.values(), key=lambda p: p.created_utc, reverse=True)
 
 
 # ---------- Digest helpers ----------
-DIGEST_QUEUE_PATH = DATA_DIR / "digests.json"     # { uid: [ {type, title, link, meta..., ts} ] }
+DIGEST_QUEUE_PATH = DATA_DIR / "digests.json"     # legacy { uid: [ {type, title, link, meta..., ts} ] }, migrated on load
+DIGEST_DIR        = DATA_DIR / "digests"          # <uid>.jsonl, one queued item per line
 DIGEST_META_PATH  = DATA_DIR / "digest_meta.json" # { uid: {"daily_last":"YYYY-MM-DD","weekly_last":"YYYY-WW"} }
 
-def _load_digests():
-    data = _load_json(DIGEST_QUEUE_PATH, {})
+def _load_digest_meta():
+    data = _load_state_doc("digest_meta", DIGEST_META_PATH, {})
     return data if isinstance(data, dict) else {}
 
-def _save_digests(d):
-    try:
-        DIGEST_QUEUE_PATH.write_text(json.dumps(d, indent=2), encoding="utf-8")
-    except Exception as e:
-        print(f"[ERROR] Saving digests: {e}")
+def _save_digest_meta():
+    _state_writer.mark("digest_meta")
 
-def _load_digest_meta():
-    data = _load_json(DIGEST_META_PATH, {})
-    return data if isinstance(data, dict) else {}
+class DigestStore:
+    """
+    Queued digest items, one append-only JSONL file per user under data/digests/
+    (or rows of state.db's digest_items with STATE_BACKEND=sqlite).
 
-def _save_digest_meta(d):
-    try:
-        DIGEST_META_PATH.write_text(json.dumps(d, indent=2), encoding="utf-8")
-    except Exception as e:
-        print(f"[ERROR] Saving digest meta: {e}")
+    add() only buffers in memory; flush() appends each user's new lines in one write,
+    normally once per poll cycle. pop_all() reads and removes just that user's items.
+    """
+    __slots__ = ("_pending",)
+
+    def __init__(self):
+        self._pending: dict[str, list[str]] = {}
+
+    @staticmethod
+    def _path(uid: str) -> Path:
+        return DIGEST_DIR / f"{uid}.jsonl"
+
+    def load(self):
+        DIGEST_DIR.mkdir(parents=True, exist_ok=True)
+        if DIGEST_QUEUE_PATH.exists():
+            # One-time migration from the old single-file queue
+            legacy = _load_json(DIGEST_QUEUE_PATH, {})
+            if isinstance(legacy, dict):
+                for uid, items in legacy.items():
+                    for item in items or []:
+                        self.add(uid, item)
+            self.flush()
+            _retire_json(DIGEST_QUEUE_PATH)
+        if _state_db is not None:
+            # One-time import of the per-user files into state.db
+            for path in DIGEST_DIR.glob("*.jsonl"):
+                for item in self._pop_file(path.stem):
+                    self.add(path.stem, item)
+            self.flush()
+
+    def add(self, uid, item: dict):
+        self._pending.setdefault(str(uid), []).append(json.dumps(item) + "\n")
+
+    def flush(self) -> bool:
+        if not self._pending:
+            return True
+        pending, self._pending = self._pending, {}
+        if _state_db is not None:
+            try:
+                _state_db.add_digest_items([(uid, line.rstrip("\n")) for uid, lines in pending.items() for line in lines])
+            except Exception as e:
+                print(f"[ERROR] Saving digest queue: {e}")
+                return False
+            return True
+        ok = True
+        for uid, lines in pending.items():
+            try:
+                with open(self._path(uid), "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+            except Exception as e:
+                print(f"[ERROR] Saving digest queue for {uid}: {e}")
+                ok = False
+        return ok
+
+    def _pop_file(self, uid: str) -> list:
+        path = self._path(uid)
+        items = []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        items.append(json.loads(line))
+                    except Exception:
+                        continue  # torn last line after a crash
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[ERROR] Reading digest queue for {uid}: {e}")
+        return items
+
+    def pop_all(self, uid) -> list:
+        uid = str(uid)
+        if _state_db is None:
+            items = self._pop_file(uid)
+        else:
+            try:
+                items = [json.loads(item) for item in _state_db.pop_digest_items(uid)]
+            except Exception as e:
+                print(f"[ERROR] Reading digest queue for {uid}: {e}")
+                items = []
+        items.extend(json.loads(line) for line in self._pending.pop(uid, []))
+        return items
+
+_digests = DigestStore()
+_digests.load()
+
+def flush_digests() -> bool:
+    return _digests.flush()
 
 def queue_digest_item(uid: int, item: dict):
-    q = _load_digests()
-    arr = q.get(str(uid), [])
-    arr.append(item)
-    q[str(uid)] = arr
-    _save_digests(q)
+    _digests.add(uid, item)
+    _unsaved_marks.append((str(uid), "digest", json.dumps(item)))
 
 def pop_all_digest_items(uid: int):
-    q = _load_digests()
-    arr = q.get(str(uid), [])
-    q[str(uid)] = []
-    _save_digests(q)
-    return arr
+    return _digests.pop_all(uid)
 
 def weekday_index(day: str) -> int:
     mapping = {"mon":0,"tue":1,"wed":2,"thu":3,"fri":4,"sat":5,"sun":6}
     return mapping.get(day.lower(), 0)
 
-def should_send_digest(uid: int) -> bool:
-    p = get_user_prefs(uid)
-    mode = p.get("digest","off")
-    if mode == "off":
-        return False
-    hh, mm = (p.get("digest_time","09:00") or "09:00").split(":")
-    hh, mm = int(hh), int(mm)
-    now = now_local()
-    due_today = (now.hour == hh and now.minute >= mm)
-    meta = _load_digest_meta()
-    rec = meta.get(str(uid), {})
+_digest_meta = _load_digest_meta()
+_state_writer.register("digest_meta", DIGEST_META_PATH, lambda: _compact_json(_digest_meta))
+
+def _digest_period_key(mode: str, when: datetime) -> str:
     if mode == "daily":
-        last = rec.get("daily_last", "")
-        today = now.strftime("%Y-%m-%d")
-        return due_today and last != today
+        return when.strftime("%Y-%m-%d")
+    iso_year, iso_week, _ = when.isocalendar()
+    return f"{iso_year}-{iso_week:02d}"
+
+def next_digest_due(uid: int) -> datetime | None:
+    """
+    Next local time the user's digest is due, or None if digests are off.
+    A slot that passed earlier in the current hour and hasn't been sent is still due
+    (same catch-up window the old once-a-minute check had).
+    """
+    p = get_user_record(uid)
+    mode = p.digest
+    if mode not in ("daily", "weekly"):
+        return None
+    try:
+        hh, mm = (int(x) for x in p.digest_time.split(":"))
+        now = now_local()
+        slot = now.replace(hour=hh, minute=mm, second=0, microsecond=0)
+    except ValueError:
+        return None
+    step = timedelta(days=1 if mode == "daily" else 7)
     if mode == "weekly":
-        if now.weekday() != weekday_index(p.get("digest_day","mon")) or not due_today:
-            return False
-        iso_year, iso_week, _ = now.isocalendar()
-        key = f"{iso_year}-{iso_week:02d}"
-        last = rec.get("weekly_last","")
-        return last != key
-    return False
+        slot += timedelta(days=(weekday_index(p.digest_day) - now.weekday()) % 7)
+    last = _digest_meta.get(str(uid), {}).get(f"{mode}_last", "")
+    while slot <= now and (last == _digest_period_key(mode, slot) or now.hour != hh or now.date() != slot.date()):
+        slot += step
+    if last == _digest_period_key(mode, slot):
+        slot += step
+    return slot
 
 def mark_digest_sent(uid: int):
-    p = get_user_prefs(uid)
-    mode = p.get("digest","off")
+    mode = get_user_record(uid).digest
     if mode == "off":
         return
-    now = now_local()
-    meta = _load_digest_meta()
-    rec = meta.get(str(uid), {})
-    if mode == "daily":
-        rec["daily_last"] = now.strftime("%Y-%m-%d")
-    elif mode == "weekly":
-        iso_year, iso_week, _ = now.isocalendar()
-        rec["weekly_last"] = f"{iso_year}-{iso_week:02d}"
-    meta[str(uid)] = rec
-    _save_digest_meta(meta)
+    rec = _digest_meta.setdefault(str(uid), {})
+    rec[f"{mode}_last"] = _digest_period_key(mode, now_local())
+    _save_digest_meta()
+
+# Min-heap of (due timestamp, uid, generation). Rescheduling bumps the user's
+# generation so stale entries are skipped when they surface.
+_digest_heap: list = []
+_digest_gen: dict[int, int] = {}
+_digest_wakeup = asyncio.Event()
+
+def schedule_digest(uid):
+    uid = int(uid)
+    gen = _digest_gen[uid] = _digest_gen.get(uid, 0) + 1
+    due = next_digest_due(uid)
+    if due is not None:
+        heapq.heappush(_digest_heap, (due.timestamp(), uid, gen))
+    _digest_wakeup.set()
+
+def reschedule_all_digests():
+    _digest_heap.clear()
+    for uid in list(user_prefs.keys()):
+        schedule_digest(uid)
 
 # ---------- Utils ----------
-def update_env_var(key, value):
+_env_updates: dict[str, str] = {}  # .env keys changed by commands, kept until a write containing them succeeds
+_env_lock = threading.Lock()
+
+def _render_env() -> str:
+    # Only the pending changes; _store_env() merges them into the file on the writer thread,
+    # so .env is never read while an in-place rewrite of it is half done
+    with _env_lock:
+        return json.dumps(_env_updates)
+
+def _store_env(rendered: str):
+    applied = json.loads(rendered)
+    updates = dict(applied)
     lines = []
     if os.path.exists(ENV_FILE):
         with open(ENV_FILE, "r", encoding="utf-8") as f:
             lines = f.readlines()
-    updated = False
     for i, line in enumerate(lines):
-        if line.startswith(f"{key}="):
-            lines[i] = f"{key}={value}\n"
-            updated = True
-            break
-    if not updated:
-        lines.append(f"{key}={value}\n")
-    with open(ENV_FILE, "w", encoding="utf-8") as f:
-        f.writelines(lines)
+        key, sep, _ = line.partition("=")
+        if sep and key in updates:
+            lines[i] = f"{key}={updates.pop(key)}\n"
+    lines.extend(f"{key}={value}\n" for key, value in updates.items())
+    text = "".join(lines)
+    try:
+        _atomic_write_text(Path(ENV_FILE), text)
+    except OSError as e:
+        if e.errno not in (errno.EBUSY, errno.EXDEV):
+            raise
+        # A single-file bind mount (./.env:/app/.env) can't be replaced; rewrite it in place
+        Path(ENV_FILE + ".tmp").unlink(missing_ok=True)
+        with open(ENV_FILE, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+    # Only now forget the updates, unless a command changed the key again meanwhile;
+    # after a failed write they stay pending and the retry renders them again
+    with _env_lock:
+        for key, value in applied.items():
+            if _env_updates.get(key) == value:
+                del _env_updates[key]
+
+# .env is configuration, not state: always a file, whatever STATE_BACKEND says
+_state_writer.register("env", Path(ENV_FILE), _render_env, _store_env)
+
+def update_env_var(key, value):
+    with _env_lock:
+        _env_updates[key] = str(value)
+    _state_writer.mark("env")
+
+# ---------- Hot reload ----------
+# .env keys applied in-process by /reloadenv; anything else (credentials, token, tuning
+# knobs sized at startup) is reported as needing a restart.
+LIVE_ENV_KEYS = {
+    "SUBREDDIT", "ALLOWED_FLAIR", "DISCORD_WEBHOOK_URL", "DISCORD_WEBHOOK_URLS", "CHECK_INTERVAL",
+    "POST_LIMIT", "ENABLE_DM", "DISCORD_USER_IDS", "ADMIN_USER_IDS", "KEYWORDS", "REDDIT_KEYWORDS",
+    "RSS_KEYWORDS", "RSS_FEEDS", "RSS_LIMIT", "DISCORD_CHANNEL_IDS", "WATCH_USERS", "THREAD_MODE",
+    "THREAD_TTL_HOURS", "TIMEZONE",
+}
+
+def _read_env_lines() -> list[str]:
+    if not os.path.exists(ENV_FILE):
+        return []
+    with open(ENV_FILE, "r", encoding="utf-8") as f:
+        return f.readlines()
+
+def _read_env_file() -> dict[str, str]:
+    _state_writer.flush_now("env")
+    values = {}
+    # Read on the writer thread, behind any .env write still in progress
+    for line in _state_writer.call(_read_env_lines):
+        if "=" in line:
+            key, value = line.strip().split("=", 1)
+            values[key] = value
+    return values
+
+def _live_settings() -> dict:
+    """Globals backed by LIVE_ENV_KEYS, parsed from os.environ the same way as at startup."""
+    def csv(key):
+        return [x.strip() for x in os.environ.get(key, "").split(",") if x.strip()]
+    return {
+        "SUBREDDIT": os.environ.get("SUBREDDIT", "selfhosted"),
+        "ALLOWED_FLAIRS": csv("ALLOWED_FLAIR"),
+        "WEBHOOK_URL": os.environ.get("DISCORD_WEBHOOK_URL", "").strip(),
+        "WEBHOOK_URLS": _parse_webhook_urls(os.environ.get("DISCORD_WEBHOOK_URLS", "")),
+        "CHECK_INTERVAL": int(os.environ.get("CHECK_INTERVAL", 300)),
+        "POST_LIMIT": int(os.environ.get("POST_LIMIT", 10)),
+        "ENABLE_DM": os.environ.get("ENABLE_DM", "false").lower() == "true",
+        "DISCORD_USER_IDS": csv("DISCORD_USER_IDS"),
+        "ADMIN_USER_IDS": csv("ADMIN_USER_IDS"),
+        "REDDIT_KEYWORDS": [k.lower() for k in csv("REDDIT_KEYWORDS")] or [k.lower() for k in csv("KEYWORDS")],
+        "RSS_KEYWORDS": [k.lower() for k in csv("RSS_KEYWORDS")],
+        "RSS_FEEDS": csv("RSS_FEEDS"),
+        "RSS_LIMIT": int(os.environ.get("RSS_LIMIT", 10)),
+        "DISCORD_CHANNEL_IDS": csv("DISCORD_CHANNEL_IDS"),
+        "WATCH_USERS": [u.lstrip("u/") for u in csv("WATCH_USERS")],
+        "GLOBAL_THREAD_MODE": os.environ.get("THREAD_MODE", "false").lower() == "true",
+        "THREAD_TTL_HOURS": int(os.environ.get("THREAD_TTL_HOURS", 24)),
+        "TZ_NAME": os.environ.get("TIMEZONE", TZ_NAME),
+    }
+
+def reload_env() -> tuple[list[str], list[str]]:
+    """
+    Re-read .env into os.environ and the live globals without restarting.
+    Returns (changed globals, changed keys that only take effect after a restart).
+    Nothing is applied if a value fails to parse.
+    """
+    values = _read_env_file()
+    before = dict(os.environ)
+    os.environ.update(values)
+    try:
+        new = _live_settings()
+    except Exception:
+        os.environ.clear()
+        os.environ.update(before)
+        raise
+    g = globals()
+    changed = [name for name, value in new.items() if g.get(name) != value]
+    for name in changed:
+        g[name] = new[name]
+    needs_restart = sorted(k for k, v in values.items() if k not in LIVE_ENV_KEYS and before.get(k) != v)
+
+    # Rebuild only what depends on what changed; the subscription index, keyword
+    # matchers, webhook senders and source schedule all read these globals live.
+    if "TZ_NAME" in changed:
+        g["TZ"] = _safe_zoneinfo(TZ_NAME)
+        reschedule_all_digests()
+    return changed, needs_restart
 
 def make_embed(title, description, color=discord.Color.blue(), url=None):
     embed = discord.Embed(title=title, description=description, color=color, timestamp=now_local())
@@ -540,17 +1652,67 @@ def _sanitize_channel_id(raw: str) -> str:
         return ids[1]
     return ids[-1]
 
+# ---------- Keyword matching ----------
+class KeywordMatcher:
+    """
+    Whole-word matcher for one keyword list, compiled once into a single alternation.
+    Callers pass lowercased text. first() reports the first keyword in *list order*
+    that matches, which is the order routes and /why have always used.
+    """
+    __slots__ = ("keywords", "_any", "_each")
+
+    def __init__(self, keywords: tuple[str, ...]):
+        self.keywords = keywords
+        self._any = re.compile(rf"\b(?:{'|'.join(re.escape(kw) for kw in keywords)})\b") if keywords else None
+        self._each = None  # per-keyword patterns, only built when first() finds a hit
+
+    def matches(self, content: str) -> bool:
+        return self._any is None or self._any.search(content) is not None
+
+    def first(self, content: str) -> str | None:
+        if self._any is None or self._any.search(content) is None:
+            return None
+        if self._each is None:
+            self._each = [(kw, re.compile(rf"\b{re.escape(kw)}\b")) for kw in self.keywords]
+        for kw, pat in self._each:
+            if pat.search(content):
+                return kw
+        return None
+
+# Keyed by list contents, so editing keywords/routes (/setmykeywords, /setredditkeywords,
+# /setglobalkeywordroute, ...) simply produces a new key; stale matchers age out of the LRU.
+@lru_cache(maxsize=4096)
+def _compile_keywords(keywords: tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+def keyword_matcher(keywords) -> KeywordMatcher:
+    return _compile_keywords(tuple(keywords or ()))
+
+@lru_cache(maxsize=1024)
+def _compile_routes(items: tuple[tuple[str, str], ...]) -> tuple[KeywordMatcher, dict]:
+    lookup = {}
+    for kw, cid in items:
+        lookup.setdefault(kw, cid)
+    return _compile_keywords(tuple(lookup)), lookup
+
+def _match_route(mapping: dict, title: str, body: str = "") -> str | None:
+    """First keyword route (in saved order) whose keyword matches title/body -> channel_id."""
+    items = tuple((str(kw or "").strip().lower(), str(cid or "").strip()) for kw, cid in mapping.items())
+    matcher, lookup = _compile_routes(tuple((kw, cid) for kw, cid in items if kw))
+    kw = matcher.first(f"{title}\n{body}".lower())
+    if kw is None:
+        return None
+    return lookup[kw] or None
+
 def matches_keywords_text(text: str, keywords_list) -> bool:
     if not keywords_list:
         return True
-    content = (text or "").lower()
-    return any(re.search(rf"\b{re.escape(kw)}\b", content) for kw in keywords_list)
+    return keyword_matcher(keywords_list).matches((text or "").lower())
 
 def matches_keywords_post(post, keywords_list) -> bool:
     if not keywords_list:
         return True
-    content = f"{post.title} {getattr(post, 'selftext', '')}".lower()
-    return any(re.search(rf"\b{re.escape(kw)}\b", content) for kw in keywords_list)
+    return keyword_matcher(keywords_list).matches(f"{post.title} {getattr(post, 'selftext', '')}".lower())
 
 def build_source_embed(title, url, description, color, source_type):
     embed = discord.Embed(title=title, url=url, description=description, color=color, timestamp=now_local())
@@ -564,87 +1726,571 @@ def build_source_embed(title, url, description, color, source_type):
         embed.set_footer(text="MultiNotify")
     return embed
 
-async def send_webhook_embed(title, url, description, color, source_type):
-    if not WEBHOOK_URL:
-        return
-    if "discord.com" in WEBHOOK_URL or "discordapp.com" in WEBHOOK_URL:
-        embed = build_source_embed(title, url, description, color, source_type)
-        try:
-            requests.post(WEBHOOK_URL, json={"embeds": [embed.to_dict()]}, timeout=10)
-        except Exception as e:
-            print(f"[ERROR] Failed to send Discord webhook embed: {e}")
-    else:
+# ---------- Item rendering ----------
+_CDATA_RE = re.compile(r"<!\[CDATA\[(.*?)\]\]>", re.S)
+_DROP_BLOCK_RE = re.compile(r"<(script|style)\b[^>]*>.*?</\1\s*>", re.S | re.I)
+_BREAK_RE = re.compile(r"<\s*(?:br|/p|/div|/li|/h[1-6]|/tr|/blockquote)\b[^>]*>", re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACES_RE = re.compile(r"[ \t\r\f\v\xa0]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+def html_to_text(raw: str, limit: int = 0) -> str:
+    """Feed HTML -> plain text: unwraps CDATA, drops script/style, keeps line breaks, decodes entities."""
+    text = _CDATA_RE.sub(r"\1", raw or "")
+    text = _DROP_BLOCK_RE.sub("", text)
+    text = _BREAK_RE.sub("\n", text)
+    text = html.unescape(_TAG_RE.sub("", text))
+    text = "\n".join(_SPACES_RE.sub(" ", line).strip() for line in text.split("\n"))
+    text = _BLANK_LINES_RE.sub("\n\n", text).strip()
+    if limit and len(text) > limit:
+        text = text[:limit - 3] + "..."
+    return text
+
+class RenderedItem:
+    """
+    A post/entry rendered once per cycle and shared by every destination: the Discord
+    embed (as a dict), the plain-text webhook body, the global DM text and the digest record.
+    Treat as read-only; the same dicts are handed to every webhook and queued job.
+    """
+    __slots__ = ("source_type", "title", "url", "embed", "webhook_text", "dm_text", "digest_item")
+
+    def __init__(self, source_type: str, title: str, url: str, description: str, color, dm_text: str, digest_item: dict):
+        self.source_type = source_type
+        self.title = title
+        self.url = url
+        self.embed = build_source_embed(title, url, description, color, source_type).to_dict()
         prefix = "[Reddit]" if source_type == "reddit" else "[RSS]"
-        msg = f"{prefix} {title}\n{url}\n{description}"
-        try:
-            requests.post(WEBHOOK_URL, json={"text": msg}, timeout=10)
-        except Exception as e:
-            print(f"[ERROR] Failed to send non-Discord webhook: {e}")
+        self.webhook_text = f"{prefix} {title}\n{url}\n{description}"
+        self.dm_text = dm_text
+        self.digest_item = digest_item
+
+def render_reddit_post(post, sub_name: str) -> RenderedItem:
+    flair = post.link_flair_text or "No Flair"
+    post_url = f"https://reddit.com{post.permalink}"
+    return RenderedItem(
+        "reddit", post.title, post_url,
+        f"Subreddit: r/{sub_name}\nFlair: **{flair}**\nAuthor: u/{post.author}",
+        discord.Color.orange(),
+        f"[Reddit] r/{sub_name} • Flair: {flair} • u/{post.author}\n{post.title}\n{post_url}",
+        {
+            "type": "reddit",
+            "title": post.title,
+            "link": post_url,
+            "subreddit": sub_name,
+            "flair": flair,
+            "author": str(post.author) if post.author else "unknown",
+            "ts": now_local().isoformat(timespec="seconds")
+        },
+    )
 
-async def notify_channels(title, url, description, color, source_type):
+def render_reddit_author_post(post, author: str, sub_name: str) -> RenderedItem:
+    flair = post.link_flair_text or "No Flair"
+    post_url = f"https://reddit.com{post.permalink}"
+    return RenderedItem(
+        "reddit", post.title, post_url,
+        f"Author: u/{author}\nSubreddit: r/{sub_name or 'unknown'}\nFlair: **{flair}**",
+        discord.Color.orange(),
+        f"[Reddit] r/{sub_name or 'unknown'} • Flair: {flair} • u/{author}\n{post.title}\n{post_url}",
+        {
+            "type": "reddit",
+            "title": post.title,
+            "link": post_url,
+            "subreddit": sub_name or "(various)",
+            "flair": flair,
+            "author": author,
+            "ts": now_local().isoformat(timespec="seconds")
+        },
+    )
+
+def render_rss_item(item: dict) -> RenderedItem:
+    feed_title, title, link = item["feed_title"], item["title"], item["link"]
+    description = f"Feed: **{feed_title}**\nSource: {domain_from_url(link)}\n\n{html_to_text(item['summary'], 500)}"
+    return RenderedItem(
+        "rss", title, link, description, discord.Color.blurple(),
+        f"[RSS] {feed_title}\n{title}\n{link}",
+        {
+            "type": "rss",
+            "title": title,
+            "link": link,
+            "feed_title": feed_title,
+            "ts": now_local().isoformat(timespec="seconds")
+        },
+    )
+
+def _render_once(cache: dict, key, render, *args) -> RenderedItem:
+    rendered = cache.get(key)
+    if rendered is None:
+        rendered = cache[key] = render(*args)
+    return rendered
+
+DISCORD_EMBED_TOTAL_CHARS = 6000  # Discord's limit across all embeds of one message
+WEBHOOK_TEXT_BATCH_CHARS = 4000   # keep joined plain-text posts well under Slack/Mattermost limits
+
+def _embed_chars(e: dict) -> int:
+    return (len(e.get("title") or "") + len(e.get("description") or "")
+            + len((e.get("footer") or {}).get("text") or "") + len((e.get("author") or {}).get("name") or ""))
+
+_webhook_session: aiohttp.ClientSession | None = None
+
+def _get_webhook_session() -> aiohttp.ClientSession:
+    # Separate from the RSS session: webhooks get their own pool, timeout and default User-Agent
+    global _webhook_session
+    if _webhook_session is None or _webhook_session.closed:
+        _webhook_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=WEBHOOK_TIMEOUT),
+        )
+    return _webhook_session
+
+class WebhookSender:
+    """
+    Bounded outbound queue plus one worker per webhook URL. Producers only wait when
+    the queue is full; the worker drains it at the webhook's real rate: it honors 429
+    Retry-After, sleeps out exhausted X-RateLimit buckets, and retries network errors
+    and 5xx responses with exponential backoff. A message still failing after
+    WEBHOOK_MAX_RETRIES (either way) is logged and dropped.
+
+    Queued items are embed dicts (Discord) or text blocks (Slack/Mattermost/...).
+    Items queued close together are coalesced: up to WEBHOOK_BATCH_MAX embeds per
+    Discord message, or one joined text post.
+    """
+    __slots__ = ("url", "is_discord", "queue", "_task", "_carry")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.is_discord = "discord.com" in url or "discordapp.com" in url
+        self.queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._carry = None  # item taken from the queue that did not fit the previous batch
+
+    async def submit(self, item):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=max(1, WEBHOOK_QUEUE_SIZE))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        await self.queue.put(item)
+
+    def _size(self, item) -> int:
+        return _embed_chars(item) if self.is_discord else len(item) + 2
+
+    def _take_batch(self, first) -> list:
+        limit = DISCORD_EMBED_TOTAL_CHARS if self.is_discord else WEBHOOK_TEXT_BATCH_CHARS
+        batch, size = [first], self._size(first)
+        while len(batch) < WEBHOOK_BATCH_MAX and not self.queue.empty():
+            item = self.queue.get_nowait()
+            n = self._size(item)
+            if size + n > limit:
+                self._carry = item
+                break
+            batch.append(item)
+            size += n
+        return batch
+
+    async def _run(self):
+        while True:
+            if self._carry is not None:
+                first, self._carry = self._carry, None
+            else:
+                first = await self.queue.get()
+                if WEBHOOK_BATCH_MAX > 1 and WEBHOOK_BATCH_LINGER > 0 and self.queue.empty():
+                    await asyncio.sleep(WEBHOOK_BATCH_LINGER)
+            batch = self._take_batch(first)
+            try:
+                if self.is_discord:
+                    await self._post({"embeds": batch})
+                else:
+                    await self._post({"text": "\n\n".join(batch)})
+            except Exception as e:
+                print(f"[ERROR] Webhook worker ({domain_from_url(self.url)}): {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _post(self, payload: dict):
+        kind = "Discord webhook embed" if self.is_discord else "non-Discord webhook"
+        backoff = 1.0
+        attempt = 0
+        limited = 0
+        while True:
+            try:
+                async with _get_webhook_session().post(self.url, json=payload) as resp:
+                    if resp.status == 429:
+                        limited += 1
+                        if limited > WEBHOOK_MAX_RETRIES:
+                            print(f"[ERROR] Dropped {kind}: still rate limited after {limited} attempts")
+                            return
+                        await asyncio.sleep(await _retry_after_seconds(resp))
+                        continue
+                    if resp.status >= 500:
+                        raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status, message=resp.reason or "")
+                    if resp.status >= 400:
+                        print(f"[ERROR] Failed to send {kind}: HTTP {resp.status} {await resp.text()}")
+                        return
+                    # Bucket exhausted: wait it out before the next message
+                    if resp.headers.get("X-RateLimit-Remaining") == "0":
+                        await asyncio.sleep(_float_header(resp.headers.get("X-RateLimit-Reset-After")))
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                attempt += 1
+                if attempt > WEBHOOK_MAX_RETRIES:
+                    print(f"[ERROR] Failed to send {kind} after {attempt} attempts: {e}")
+                    return
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+def _float_header(value, default: float = 0.0) -> float:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return default
+
+async def _retry_after_seconds(resp) -> float:
+    # Discord puts the precise value in the JSON body; others only send the header
+    try:
+        data = await resp.json(content_type=None)
+        if isinstance(data, dict) and "retry_after" in data:
+            return _float_header(data["retry_after"], 1.0)
+    except Exception:
+        pass
+    return _float_header(resp.headers.get("Retry-After"), 1.0)
+
+_webhook_senders: dict[str, WebhookSender] = {}
+
+def _webhook_sender(url: str) -> WebhookSender:
+    sender = _webhook_senders.get(url)
+    if sender is None:
+        sender = _webhook_senders[url] = WebhookSender(url)
+    return sender
+
+def webhook_targets(source_type: str) -> list[str]:
+    """Webhook URLs that should receive items from this source ("reddit" or "rss")."""
+    urls = [WEBHOOK_URL] if WEBHOOK_URL else []
+    for url, source in WEBHOOK_URLS:
+        if source in ("all", source_type) and url not in urls:
+            urls.append(url)
+    return urls
+
+async def send_webhook_embed(item: RenderedItem):
+    for target in webhook_targets(item.source_type):
+        sender = _webhook_sender(target)
+        await sender.submit(item.embed if sender.is_discord else item.webhook_text)
+
+def notify_channels(item: RenderedItem):
     # Headless: skip Discord channel sends
     if HEADLESS:
         return
-    if not DISCORD_CHANNEL_IDS:
-        return
-    embed = build_source_embed(title, url, description, color, source_type)
-    for cid in DISCORD_CHANNEL_IDS:
-        try:
-            channel = client.get_channel(int(cid))
-            if channel is None:
-                channel = await client.fetch_channel(int(cid))
-            if GLOBAL_THREAD_MODE and isinstance(channel, discord.TextChannel):
-                # Thread key based on source type & host/subreddit
-                if source_type == "reddit":
-                    tkey = f"global:reddit:{domain_from_url(url)}"
-                    tname = "Reddit • Global"
-                else:
-                    tkey = f"global:rss:{domain_from_url(url)}"
-                    tname = "RSS • Global"
-                await _send_to_channel_threaded(channel, tkey, tname, embed)
-            else:
-                await channel.send(embed=embed)
-        except Exception as e:
-            print(f"[ERROR] Failed to send to channel {cid}: {e}")
+    notify_channels_specific(DISCORD_CHANNEL_IDS, item)
 
 
-async def notify_channels_specific(channel_ids: list[str], title, url, description, color, source_type):
-    """Send global notifications to a specific subset of channels (used by global keyword routing)."""
+def notify_channels_specific(channel_ids: list[str], item: RenderedItem):
+    """Queue global notifications for a specific subset of channels (used by global keyword routing)."""
     if HEADLESS:
         return
-    if not channel_ids:
-        return
-    embed = build_source_embed(title, url, description, color, source_type)
-    for cid in channel_ids:
-        try:
-            channel = client.get_channel(int(cid))
-            if channel is None:
-                channel = await client.fetch_channel(int(cid))
-            if GLOBAL_THREAD_MODE and isinstance(channel, discord.TextChannel):
-                if source_type == "reddit":
-                    tkey = f"global:reddit:{domain_from_url(url)}"
-                    tname = "Reddit • Global"
-                else:
-                    tkey = f"global:rss:{domain_from_url(url)}"
-                    tname = "RSS • Global"
-                await _send_to_channel_threaded(channel, tkey, tname, embed)
-            else:
-                await channel.send(embed=embed)
-        except Exception as e:
-            print(f"[ERROR] Failed to send to channel {cid}: {e}")
+    for cid in channel_ids or []:
+        _delivery.enqueue(f"channel:{cid}", "channel", {
+            "channel_id": str(cid), "url": item.url, "source_type": item.source_type, "embed": item.embed,
+        })
+
+def _job_embed(job: dict) -> discord.Embed:
+    if "embed" in job:
+        return discord.Embed.from_dict(job["embed"])
+    # Jobs queued before items were pre-rendered carry the raw fields
+    return build_source_embed(job["title"], job["url"], job["description"], discord.Color(job["color"]), job["source_type"])
+
+async def _deliver_to_channel(job: dict):
+    cid = job["channel_id"]
+    url = job["url"]
+    source_type = job["source_type"]
+    embed = _job_embed(job)
+    channel = client.get_channel(int(cid))
+    if channel is None:
+        channel = await client.fetch_channel(int(cid))
+    if GLOBAL_THREAD_MODE and isinstance(channel, discord.TextChannel):
+        # Thread key based on source type & host/subreddit
+        if source_type == "reddit":
+            tkey = f"global:reddit:{domain_from_url(url)}"
+            tname = "Reddit • Global"
+        else:
+            tkey = f"global:rss:{domain_from_url(url)}"
+            tname = "RSS • Global"
+        await _send_to_channel_threaded(channel, tkey, tname, embed)
+    else:
+        await channel.send(embed=embed)
+
+# ---------- DM channel cache ----------
+# Every DM path (global fanout, personal deliveries, digests) resolves users through here:
+# client.get_user() from the gateway cache first, fetch_user() only on a miss, and the
+# DM channel from create_dm() is reused until it ages out (LRU + TTL).
+_dm_cache: OrderedDict = OrderedDict()  # uid -> (expires_at, DMChannel)
+_dm_cache_stats = {"hits": 0, "misses": 0}
+
+async def get_dm_channel(uid: int):
+    uid = int(uid)
+    now = asyncio.get_running_loop().time()
+    rec = _dm_cache.get(uid)
+    if rec is not None and rec[0] > now:
+        _dm_cache.move_to_end(uid)
+        _dm_cache_stats["hits"] += 1
+        return rec[1]
+    _dm_cache_stats["misses"] += 1
+    user = client.get_user(uid) or await client.fetch_user(uid)
+    channel = user.dm_channel or await user.create_dm()
+    _dm_cache[uid] = (now + DM_CACHE_TTL, channel)
+    _dm_cache.move_to_end(uid)
+    while len(_dm_cache) > max(1, DM_CACHE_SIZE):
+        _dm_cache.popitem(last=False)
+    return channel
+
+async def send_dm(uid: int, content: str | None = None, embed: discord.Embed | None = None):
+    channel = await get_dm_channel(uid)
+    try:
+        await channel.send(content=content, embed=embed)
+    except Exception:
+        # Blocked/closed DMs: re-resolve next time instead of reusing a bad channel
+        _dm_cache.pop(int(uid), None)
+        raise
 
-async def notify_dms(message: str):
+def notify_dms(message: str):
     # Headless: skip Discord DMs
     if HEADLESS:
         return
     if not (ENABLE_DM and DISCORD_USER_IDS):
         return
     for uid in DISCORD_USER_IDS:
+        _delivery.enqueue(f"dm:{uid}", "dm", {"uid": int(uid), "text": message})
+
+def notify_user_dm(uid: int, item: RenderedItem):
+    """Queue a personal delivery embed for a user's DMs."""
+    if HEADLESS:
+        return
+    _delivery.enqueue(f"dm:{uid}", "dm", {"uid": int(uid), "embed": item.embed})
+
+async def _deliver_dm(job: dict):
+    if "text" in job:
+        await send_dm(job["uid"], job["text"])
+    else:
+        await send_dm(job["uid"], embed=_job_embed(job))
+
+# ---------- Delivery queue ----------
+class TokenBucket:
+    """Async token bucket: take() waits until a token is available (rate per second, up to burst)."""
+    __slots__ = ("rate", "burst", "_tokens", "_stamp")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(0.01, rate)
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._stamp = None
+
+    async def take(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self._stamp is not None:
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+_global_send_bucket = TokenBucket(DELIVERY_GLOBAL_RATE, DELIVERY_GLOBAL_RATE)
+_route_send_buckets: dict[str, TokenBucket] = {}
+
+def _route_bucket(dest: str) -> TokenBucket:
+    bucket = _route_send_buckets.get(dest)
+    if bucket is None:
+        bucket = _route_send_buckets[dest] = TokenBucket(DELIVERY_ROUTE_RATE, DELIVERY_ROUTE_BURST)
+    return bucket
+
+# dest -> {"sent", "failed", "total_ms", "max_ms", "last_error"}
+_delivery_stats: dict[str, dict] = {}
+
+def _record_delivery(dest: str, elapsed_ms: float, error: Exception | None):
+    st = _delivery_stats.get(dest)
+    if st is None:
+        st = _delivery_stats[dest] = {"sent": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0, "last_error": ""}
+    if error is None:
+        st["sent"] += 1
+        st["total_ms"] += elapsed_ms
+        st["max_ms"] = max(st["max_ms"], elapsed_ms)
+    else:
+        st["failed"] += 1
+        st["last_error"] = str(error)[:200]
+
+DELIVERY_DB_PATH = DATA_DIR / "delivery_queue.db"
+
+class DeliveryQueue:
+    """
+    Durable queue of Discord sends (channel posts and DMs), decoupled from fetching.
+
+    process_reddit()/process_rss() only enqueue; DELIVERY_WORKERS tasks drain the queue,
+    so one item fans out to all its channels and DM users concurrently. Jobs for one
+    destination ("channel:<id>" / "dm:<uid>") are delivered strictly in order, one at a
+    time, paced by a per-destination and a global token bucket. Failures back off
+    exponentially; after DELIVERY_MAX_ATTEMPTS (or on Forbidden/NotFound) a job is kept
+    as state='dead' for inspection, for up to DELIVERY_DEAD_DAYS. Jobs left in flight by
+    a crash or restart are picked up again on startup.
+
+    enqueue() only stages a job; commit() writes the staged jobs together with the seen IDs
+    and digest entries recorded for them (the marks table) in one transaction. The marks
+    stay until the end-of-cycle flush has saved them to the seen and digest stores, and are
+    replayed on startup if it never did, so a crash mid-cycle never sends an item twice.
+    """
+    HANDLERS = {"channel": _deliver_to_channel, "dm": _deliver_dm}
+
+    def __init__(self, path: Path):
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " dest TEXT NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+            " state TEXT NOT NULL DEFAULT 'pending',"
+            " attempts INTEGER NOT NULL DEFAULT 0, next_at REAL NOT NULL DEFAULT 0,"
+            " created REAL NOT NULL, error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state_dest ON jobs(state, dest, id)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS marks (scope TEXT NOT NULL, kind TEXT NOT NULL, value TEXT NOT NULL)")
+        self._db.execute("UPDATE jobs SET state='pending' WHERE state='inflight'")
+        self._busy: set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task] = []
+        self._next_sweep = 0.0
+        self._staged: list[tuple] = []  # jobs enqueued since the last commit()
+
+    def enqueue(self, dest: str, kind: str, payload: dict):
+        self._staged.append((dest, kind, json.dumps(payload), now_local().timestamp()))
+
+    def commit(self, marks: list):
+        """Write the staged jobs and their seen/digest marks in one transaction."""
+        if not self._staged and not marks:
+            return
+        jobs, self._staged = self._staged, []
         try:
-            user = await client.fetch_user(int(uid))
-            await user.send(message)
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT INTO jobs (dest, kind, payload, created) VALUES (?, ?, ?, ?)", jobs)
+            self._db.executemany("INSERT INTO marks (scope, kind, value) VALUES (?, ?, ?)", marks)
+            self._db.execute("COMMIT")
         except Exception as e:
-            print(f"[ERROR] Failed to DM {uid}: {e}")
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            print(f"[ERROR] Queueing {len(jobs)} deliveries: {e}")
+            return
+        if jobs:
+            self._wakeup.set()
+
+    def clear_marks(self):
+        try:
+            self._db.execute("DELETE FROM marks")
+        except Exception as e:
+            print(f"[ERROR] Clearing delivery marks: {e}")
+
+    def replay_marks(self):
+        """Re-apply marks a crash left unsaved (startup, after the seen and digest stores load)."""
+        rows = self._db.execute("SELECT scope, kind, value FROM marks").fetchall()
+        if not rows:
+            return
+        for scope, kind, value in rows:
+            if kind == "digest":
+                _digests.add(scope, json.loads(value))
+            else:
+                _seen.add(scope, kind, value)
+        print(f"[INFO] Delivery queue: restored {len(rows)} seen/digest mark(s) from an interrupted cycle")
+        if _seen.flush() and _digests.flush():
+            self.clear_marks()
+
+    def counts(self) -> dict:
+        return dict(self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def sweep(self, now: float):
+        """Drop dead-lettered jobs older than DELIVERY_DEAD_DAYS; _claim() calls this hourly."""
+        self._next_sweep = now + 3600
+        if DELIVERY_DEAD_DAYS <= 0:
+            return
+        dropped = self._db.execute(
+            "DELETE FROM jobs WHERE state='dead' AND MAX(next_at, created) < ?", (now - DELIVERY_DEAD_DAYS * 86400,)
+        ).rowcount
+        if dropped:
+            print(f"[INFO] Delivery queue: removed {dropped} dead-lettered job(s) older than {DELIVERY_DEAD_DAYS} day(s)")
+
+    def _claim(self, now: float):
+        if now >= self._next_sweep:
+            self.sweep(now)
+        # Head of each destination's queue; a later job never overtakes one that is backing off
+        rows = self._db.execute(
+            "SELECT id, dest, kind, payload, attempts, next_at FROM jobs"
+            " WHERE id IN (SELECT MIN(id) FROM jobs WHERE state IN ('pending', 'inflight') GROUP BY dest)"
+            " AND state='pending' ORDER BY id"
+        ).fetchall()
+        next_due = None
+        for job_id, dest, kind, payload, attempts, next_at in rows:
+            if dest in self._busy:
+                continue
+            if next_at > now:
+                next_due = next_at if next_due is None else min(next_due, next_at)
+                continue
+            self._db.execute("UPDATE jobs SET state='inflight' WHERE id=?", (job_id,))
+            self._busy.add(dest)
+            return (job_id, dest, kind, payload, attempts), None
+        return None, next_due
+
+    def _finish(self, job_id: int, dest: str, attempts: int, error: Exception | None):
+        self._busy.discard(dest)
+        if error is None:
+            self._db.execute("DELETE FROM jobs WHERE id=?", (job_id,))
+        elif attempts >= DELIVERY_MAX_ATTEMPTS or isinstance(error, (discord.Forbidden, discord.NotFound)):
+            print(f"[ERROR] Delivery to {dest} dead-lettered after {attempts} attempt(s): {error}")
+            self._db.execute(
+                "UPDATE jobs SET state='dead', attempts=?, next_at=?, error=? WHERE id=?",
+                (attempts, now_local().timestamp(), str(error), job_id),
+            )
+        else:
+            delay = min(600, 5 * 2 ** (attempts - 1))
+            print(f"[WARN] Delivery to {dest} failed (attempt {attempts}), retrying in {delay}s: {error}")
+            self._db.execute(
+                "UPDATE jobs SET state='pending', attempts=?, next_at=?, error=? WHERE id=?",
+                (attempts, now_local().timestamp() + delay, str(error), job_id),
+            )
+        self._wakeup.set()
+
+    async def _worker(self):
+        while True:
+            claimed, next_due = self._claim(now_local().timestamp())
+            if claimed is None:
+                self._wakeup.clear()
+                timeout = max(0.0, next_due - now_local().timestamp()) if next_due is not None else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job_id, dest, kind, payload, attempts = claimed
+            error = None
+            try:
+                await _route_bucket(dest).take()
+                await _global_send_bucket.take()
+                started = asyncio.get_running_loop().time()
+                try:
+                    await self.HANDLERS[kind](json.loads(payload))
+                except Exception as e:
+                    error = e
+                _record_delivery(dest, (asyncio.get_running_loop().time() - started) * 1000, error)
+            except Exception as e:
+                error = e
+            try:
+                self._finish(job_id, dest, attempts + 1, error)
+            except Exception as e:
+                self._busy.discard(dest)
+                print(f"[ERROR] Delivery queue bookkeeping for {dest}: {e}")
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(max(1, DELIVERY_WORKERS))]
+
+_delivery = DeliveryQueue(DELIVERY_DB_PATH)
+_delivery.replay_marks()
 
 # ---------- Unions ----------
 def union_user_subreddits():
@@ -685,14 +2331,7 @@ def _first_matching_keyword(text: str, keywords: list[str]) -> str | None:
     """
     if not keywords:
         return None
-    content = (text or "").lower()
-    for kw in keywords:
-        try:
-            if re.search(rf"\b{re.escape(kw)}\b", content):
-                return kw
-        except Exception:
-            continue
-    return None
+    return keyword_matcher(keywords).first((text or "").lower())
 
 def _route_channel_for_user(uid: int, source_type: str, title: str, body: str = "") -> str | None:
     """
@@ -701,78 +2340,501 @@ def _route_channel_for_user(uid: int, source_type: str, title: str, body: str =
     - if user has keyword_routes[source_type][keyword] = cid,
       and that keyword matches title/body -> return channel_id.
     """
-    p = get_user_prefs(uid)
-    routes = p.get("keyword_routes", {}) or {}
+    routes = get_user_record(uid).keyword_routes or {}
     mapping = routes.get(source_type, {}) if isinstance(routes, dict) else {}
     if not isinstance(mapping, dict) or not mapping:
         return None
-
-    # Check in deterministic order: keyword_routes dict iteration order (saved order)
-    haystack = f"{title}\n{body}".lower()
-    for kw, cid in mapping.items():
-        kw_n = (kw or "").strip().lower()
-        if not kw_n:
-            continue
-        try:
-            if re.search(rf"\b{re.escape(kw_n)}\b", haystack):
-                cid = (cid or "").strip()
-                return cid if cid else None
-        except Exception:
-            continue
-    return None
+    # Deterministic order: keyword_routes dict iteration order (saved order)
+    return _match_route(mapping, title, body)
 
 def _route_channel_global(source_type: str, title: str, body: str = "") -> str | None:
     """Admin-managed global keyword → channel routing."""
     routes = global_keyword_routes.get(source_type, {}) if isinstance(global_keyword_routes, dict) else {}
     if not isinstance(routes, dict) or not routes:
         return None
-    haystack = f"{title}\n{body}".lower()
-    for kw, cid in routes.items():
-        kw_n = (kw or "").strip().lower()
-        if not kw_n:
-            continue
-        try:
-            if re.search(rf"\b{re.escape(kw_n)}\b", haystack):
-                cid = (cid or "").strip()
-                return cid if cid else None
-        except Exception:
+    return _match_route(routes, title, body)
+
+
+# ---------- Reddit fetch layer ----------
+# PRAW is blocking, so listings are materialized in worker threads. The event loop
+# (gateway, slash commands, digest_scheduler) stays responsive during a poll and a
+# cycle takes roughly as long as its slowest listing instead of the sum of all.
+_reddit_pool = ThreadPoolExecutor(max_workers=max(1, REDDIT_FETCH_WORKERS), thread_name_prefix="reddit-fetch")
+
+def _fetch_listing_blocking(kind: str, name: str, limit: int, before: str | None = None) -> list:
+    if before:
+        return _fetch_newer_blocking(kind, name, before)
+    if kind == "subreddit":
+        return list(reddit.subreddit(name).new(limit=limit))
+    return list(reddit.redditor(name).submissions.new(limit=limit))
+
+def _fetch_newer_blocking(kind: str, name: str, before: str) -> list:
+    """
+    Posts newer than the `before` fullname, newest first. Each request returns the 100
+    posts just after the cursor, so a full page means more arrived: keep paging toward
+    the present (up to REDDIT_BACKFILL_PAGES) instead of dropping the overflow.
+    One reddit.get() per page; a ListingGenerator would follow `after` back into old posts.
+    """
+    path = f"r/{name}/new" if kind == "subreddit" else f"user/{name}/submitted"
+    out = []
+    for _ in range(max(1, REDDIT_BACKFILL_PAGES)):
+        params = {"before": before, "limit": 100}
+        if kind == "redditor":
+            params["sort"] = "new"
+        page = list(reddit.get(path, params=params))
+        out = page + out
+        if len(page) < 100:
+            break
+        before = page[0].fullname
+    return out
+
+async def fetch_reddit_listings(jobs: list[tuple]) -> dict:
+    """
+    Fetch PRAW listings concurrently.
+    - jobs: [(kind, name, limit[, before])] where kind is "subreddit" or "redditor" and
+      `before` is a cursor fullname (only newer posts are returned)
+    - returns {(kind, name): [submission, ...]}; failed or timed-out sources are omitted
+    """
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(max(1, REDDIT_FETCH_CONCURRENCY))
+    results = {}
+
+    async def _one(kind: str, name: str, limit: int, before: str | None = None):
+        label = f"r/{name}" if kind == "subreddit" else f"u/{name}"
+        async with sem:
+            try:
+                fut = loop.run_in_executor(_reddit_pool, _fetch_listing_blocking, kind, name, limit, before)
+                results[(kind, name)] = await asyncio.wait_for(fut, timeout=REDDIT_FETCH_TIMEOUT)
+            except asyncio.TimeoutError:
+                print(f"[WARN] Fetch {kind} {label} timed out after {REDDIT_FETCH_TIMEOUT}s")
+            except Exception as e:
+                print(f"[ERROR] Fetch {kind} {label}: {e}")
+
+    await asyncio.gather(*(_one(*job) for job in jobs))
+    return results
+
+def _subreddit_batches(subs) -> list[list[str]]:
+    """
+    Group subreddits for combined r/a+b+c listings. Groups are sized so one request
+    (limit <= 100) still covers POST_LIMIT posts per member, and the joined name stays
+    under REDDIT_BATCH_MAX_CHARS.
+    """
+    per_batch = max(1, min(REDDIT_BATCH_MAX_SUBS, 100 // max(1, POST_LIMIT)))
+    batches, cur = [], []
+    for sub in sorted(subs):
+        if cur and (len(cur) >= per_batch or len("+".join(cur + [sub])) > REDDIT_BATCH_MAX_CHARS):
+            batches.append(cur)
+            cur = []
+        cur.append(sub)
+    if cur:
+        batches.append(cur)
+    return batches
+
+def _subreddit_jobs(subs) -> list[tuple]:
+    if not REDDIT_BATCH_SUBS:
+        return [("subreddit", sub, POST_LIMIT, _cursor_for("subreddit", sub)) for sub in subs]
+    # Combined listings can't carry per-subreddit cursors; _after_cursors() filters them instead
+    return [("subreddit", "+".join(group), POST_LIMIT * len(group)) for group in _subreddit_batches(subs)]
+
+def _fan_out_batches(listings: dict) -> dict:
+    """Split combined a+b+c listings back into per-subreddit entries (newest POST_LIMIT each)."""
+    out = {}
+    for (kind, name), posts in listings.items():
+        if kind != "subreddit" or "+" not in name:
+            out[(kind, name)] = posts
             continue
-    return None
+        members = name.split("+")
+        for sub in members:
+            out[("subreddit", sub)] = []
+        for submission in posts:
+            sub = _norm_sub(getattr(getattr(submission, "subreddit", None), "display_name", "") or "")
+            bucket = out.get(("subreddit", sub))
+            if bucket is not None and len(bucket) < POST_LIMIT:
+                bucket.append(submission)
+    return out
+
+# ---------- Reddit cursors ----------
+REDDIT_CURSORS_PATH = DATA_DIR / "reddit_cursors.json"  # { "subreddit:name": {"fullname", "created", "empty"} }
+_reddit_cursors = _load_state_doc("reddit_cursors", REDDIT_CURSORS_PATH, {})
+if not isinstance(_reddit_cursors, dict):
+    _reddit_cursors = {}
+
+def _save_reddit_cursors():
+    _state_writer.mark("reddit_cursors")
+
+_state_writer.register("reddit_cursors", REDDIT_CURSORS_PATH, lambda: _compact_json(_reddit_cursors))
+
+def _cursor_for(kind: str, name: str) -> str | None:
+    cur = _reddit_cursors.get(f"{kind}:{name}")
+    if not cur:
+        return None
+    # A deleted/removed cursor post makes `before` return nothing forever, so after
+    # several empty polls fetch a plain listing and compare by created_utc instead
+    if cur.get("empty", 0) >= REDDIT_CURSOR_VERIFY_EVERY:
+        return None
+    return cur["fullname"]
+
+def _after_cursors(listings: dict) -> dict:
+    """Drop posts at or before each source's cursor."""
+    out = {}
+    for (kind, name), posts in listings.items():
+        cur = _reddit_cursors.get(f"{kind}:{name}")
+        if cur:
+            posts = [p for p in posts if p.created_utc >= cur["created"] and p.fullname != cur["fullname"]]
+        out[(kind, name)] = posts
+    return out
+
+def _advance_cursors(listings: dict):
+    """
+    Move each source's cursor to its newest post. Called once the cycle's deliveries are
+    queued and marked seen; posts skipped for quiet hours are held per user instead.
+    """
+    for (kind, name), posts in listings.items():
+        key = f"{kind}:{name}"
+        cur = _reddit_cursors.get(key)
+        if posts:
+            newest = max(posts, key=lambda p: p.created_utc)
+            _reddit_cursors[key] = {"fullname": newest.fullname, "created": newest.created_utc, "empty": 0}
+        elif cur:
+            cur["empty"] = 0 if cur.get("empty", 0) >= REDDIT_CURSOR_VERIFY_EVERY else cur.get("empty", 0) + 1
+    if listings:
+        _save_reddit_cursors()
+
+# ---------- Author watch coverage ----------
+# author -> subreddits seen in their own listings. An author whose posts all land in
+# subreddits we already poll is "covered": process_reddit() picks their posts out of the
+# subreddit listings and polls their author listing only every SOURCE_MAX_INTERVAL, whether
+# or not ADAPTIVE_POLLING is on.
+_author_subs: dict[str, set[str]] = {}
+_author_next_poll: dict[str, float] = {}  # covered author -> when their own listing is next fetched
+
+def _author_covered(author: str, posts: list, polled_subs) -> bool:
+    subs = _author_subs.setdefault(author, set())
+    for post in posts:
+        subs.add(_norm_sub(getattr(getattr(post, "subreddit", None), "display_name", "") or ""))
+    return bool(subs) and subs <= set(polled_subs)
+
+def _author_listing_due(authors, polled_subs, now: float) -> list[str]:
+    for author in [a for a in _author_next_poll if a not in authors]:
+        del _author_next_poll[author]
+    polled_subs = set(polled_subs)
+    # Coverage lapses as soon as one of the author's subreddits is no longer polled
+    return [a for a in authors if _author_next_poll.get(a, 0) <= now or not _author_subs.get(a, set()) <= polled_subs]
+
+# ---------- Recent items ----------
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "source"}
+
+def _normalize_link(url: str) -> str:
+    """Comparable form of a link: no scheme/www/fragment/trailing slash, tracking params dropped."""
+    url = (url or "").strip()
+    try:
+        parts = urlparse(url)
+    except Exception:
+        return url
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = "&".join(sorted(
+        q for q in parts.query.split("&")
+        if q and not (q.split("=", 1)[0].lower().startswith("utm_") or q.split("=", 1)[0].lower() in _TRACKING_PARAMS)
+    ))
+    return f"{host}{parts.path.rstrip('/')}" + (f"?{query}" if query else "")
+
+def _rss_item_from_entry(feed_url: str, feed_title: str, entry) -> dict | None:
+    entry_id = entry.get("id") or entry.get("link") or f"{entry.get('title','')}-{entry.get('published','')}"
+    if not entry_id:
+        return None
+    return {
+        "feed_title": feed_title,
+        "title": entry.get("title", "Untitled"),
+        "link": entry.get("link", feed_url),
+        "summary": entry.get("summary", "") or entry.get("description", ""),
+        "id": entry_id,
+        "feed_url": feed_url
+    }
+
+class RecentItems:
+    """
+    Bounded LRU of posts/entries seen by the poller, so /why, /whyexpected and /whyglobal
+    answer from memory. Reddit submissions are indexed by ID, link and normalized link;
+    RSS items (the same dicts process_rss() builds) by link and normalized link. Each
+    source has its own link namespaces, so an RSS lookup never returns a Reddit post.
+    """
+    __slots__ = ("_items", "_index")
+
+    def __init__(self):
+        self._items: OrderedDict = OrderedDict()  # item key -> (record, lookup keys)
+        self._index: dict[tuple, tuple] = {}      # lookup key -> item key
+
+    def _unindex(self, item_key: tuple, lookup_keys: tuple):
+        for k in lookup_keys:
+            if self._index.get(k) == item_key:
+                del self._index[k]
+
+    def _add(self, item_key: tuple, record, lookup_keys: tuple):
+        old = self._items.pop(item_key, None)
+        if old is not None:
+            self._unindex(item_key, old[1])
+        self._items[item_key] = (record, lookup_keys)
+        for k in lookup_keys:
+            self._index[k] = item_key
+        while len(self._items) > max(1, RECENT_ITEMS_LIMIT):
+            evicted, (_, keys) = self._items.popitem(last=False)
+            self._unindex(evicted, keys)
+
+    def _get(self, lookup_key: tuple):
+        item_key = self._index.get(lookup_key)
+        if item_key is None:
+            return None
+        self._items.move_to_end(item_key)
+        return self._items[item_key][0]
+
+    def add_reddit_post(self, post):
+        link = f"https://reddit.com{post.permalink}"
+        self._add(("reddit", post.id), post, (("reddit", post.id), ("reddit_link", link), ("reddit_norm", _normalize_link(link))))
+
+    def add_rss_item(self, item: dict):
+        link = item["link"]
+        self._add(("rss", item["feed_url"], item["id"]), item, (("rss_link", link), ("rss_norm", _normalize_link(link))))
+
+    def reddit_post(self, rid: str):
+        return self._get(("reddit", rid.lower()))
+
+    def rss_item(self, url: str) -> dict | None:
+        return self._get(("rss_link", url.strip())) or self._get(("rss_norm", _normalize_link(url)))
+
+_recent = RecentItems()
+
+def _fetch_submission_blocking(rid: str):
+    post = reddit.submission(id=rid)
+    # Touch fields to ensure fetch
+    _ = post.title
+    return post
+
+async def lookup_reddit_post(rid: str):
+    """Submission from the recent-items cache, else one fetch on the Reddit pool."""
+    post = _recent.reddit_post(rid)
+    if post is None:
+        loop = asyncio.get_running_loop()
+        post = await asyncio.wait_for(loop.run_in_executor(_reddit_pool, _fetch_submission_blocking, rid), REDDIT_FETCH_TIMEOUT)
+        _recent.add_reddit_post(post)
+    return post
+
+# ---------- Source scheduler ----------
+class SourceScheduler:
+    """
+    Next-due time per polled source (kind "subreddit"/"redditor"/"feed", name).
+
+    A source that produced new items is polled about once per expected new item (from
+    an EWMA of its item rate), never more often than SOURCE_MIN_INTERVAL; one that
+    produced nothing backs off exponentially up to SOURCE_MAX_INTERVAL. Feeds also
+    honor Cache-Control max-age, RSS <ttl> and <skipHours>. With ADAPTIVE_POLLING off
+    every source is due every cycle, as before.
+    """
+    __slots__ = ("_state",)
+
+    def __init__(self):
+        # (kind, name) -> [next_due, interval, items_per_sec, last_polled, ids from last poll]
+        self._state: dict[tuple[str, str], list] = {}
+
+    @staticmethod
+    def bounds() -> tuple[int, int]:
+        lo = max(1, min(SOURCE_MIN_INTERVAL, CHECK_INTERVAL))
+        return lo, max(lo, SOURCE_MAX_INTERVAL)
+
+    def due(self, kind: str, names, now: float) -> list[str]:
+        names = list(names)
+        current = set(names)
+        # Forget sources nobody follows any more
+        for key in [k for k in self._state if k[0] == kind and k[1] not in current]:
+            del self._state[key]
+        if not ADAPTIVE_POLLING:
+            return names
+        return [n for n in names if (kind, n) not in self._state or self._state[(kind, n)][0] <= now]
+
+    def record(self, kind: str, name: str, item_ids, now: float, hint: int = 0, skip_hours: frozenset = frozenset()):
+        lo, hi = self.bounds()
+        ids = frozenset(item_ids)
+        st = self._state.get((kind, name))
+        if st is None:
+            # First poll only sets the baseline
+            st = self._state[(kind, name)] = [0.0, float(CHECK_INTERVAL), 0.0, now, ids]
+        else:
+            new = len(ids - st[4])
+            rate = new / max(1.0, now - st[3])
+            st[2] = rate if not st[2] else 0.7 * st[2] + 0.3 * rate
+            st[1] = (1 / st[2]) if new else st[1] * 2
+            st[3], st[4] = now, ids
+        st[1] = min(hi, max(lo, st[1]))
+        st[0] = _skip_hours(now + max(st[1], min(hint, 86400)), skip_hours)
+
+    def failed(self, kind: str, name: str, now: float):
+        lo, hi = self.bounds()
+        st = self._state.get((kind, name))
+        if st is None:
+            st = self._state[(kind, name)] = [0.0, float(CHECK_INTERVAL), 0.0, now, frozenset()]
+        st[1] = min(hi, max(lo, st[1] * 2))
+        st[0] = now + st[1]
+
+    def summary(self, now: float) -> str:
+        if not ADAPTIVE_POLLING:
+            return f"every {CHECK_INTERVAL}s"
+        lo, hi = self.bounds()
+        due_soon = sum(1 for st in self._state.values() if st[0] - now <= lo)
+        return f"adaptive {lo}s–{hi}s ({len(self._state)} sources, {due_soon} due within {lo}s)"
+
+def _skip_hours(ts: float, skip_hours: frozenset) -> float:
+    """Push a due time out of the feed's <skipHours> (GMT hours)."""
+    if not skip_hours or len(skip_hours) >= 24:
+        return ts
+    while int(ts // 3600) % 24 in skip_hours:
+        ts = (ts // 3600 + 1) * 3600
+    return ts
+
+_source_schedule = SourceScheduler()
+
+def poll_tick_seconds() -> int:
+    return SourceScheduler.bounds()[0] if ADAPTIVE_POLLING else CHECK_INTERVAL
+
+# ---------- Cycle dedup ----------
+def _commit_item_marks():
+    """Commit the item just handled: its delivery jobs plus its seen IDs and digest entries."""
+    marks = _unsaved_marks[:]
+    _unsaved_marks.clear()
+    _delivery.commit(marks)
+
+def flush_cycle_marks():
+    """End of a poll cycle: save seen IDs and digest entries in one batch each, then drop
+    the delivery queue's copies of them."""
+    _commit_item_marks()  # anything a failed process_*() left staged
+    saved = flush_seen()
+    if flush_digests() and saved:
+        _delivery.clear_marks()
+
+class CycleItems:
+    """
+    Canonical items sighted during one poll cycle. The same Reddit post can come from a
+    subreddit and an author listing, and the same article from several feeds under
+    different entry IDs. Sightings are merged per canonical key (Reddit ID or RSS entry ID)
+    before filtering, and each user is handled at most once per canonical item.
+    """
+    __slots__ = ("_items", "_done", "_links")
+
+    def __init__(self):
+        self._items: dict[str, tuple] = {}  # key -> (first sighting, [sources], [sighting IDs]), in first-sighting order
+        self._done: set[tuple] = set()      # (uid, key) already delivered/queued/marked this cycle
+        self._links: dict[str, tuple] = {}  # normalized link -> (key, source) of its first sighting
+
+    def add(self, key: str, item, source, item_id: str | None = None) -> bool:
+        item_id = key if item_id is None else item_id
+        entry = self._items.get(key)
+        if entry is None:
+            self._items[key] = (item, [source], [item_id])
+            return True
+        if source not in entry[1]:
+            entry[1].append(source)
+        if item_id not in entry[2]:
+            entry[2].append(item_id)
+        return False
 
+    def canonical(self, key: str, link: str | None, source) -> str:
+        """
+        The key an RSS sighting is merged under: its own entry ID, or the first sighting's ID
+        when another feed carried the same link this cycle. Entries sharing a link within
+        one feed (a homepage or status page link) stay separate.
+        """
+        if not link:
+            return key
+        first_key, first_source = self._links.setdefault(link, (key, source))
+        return first_key if first_source != source else key
+
+    def items(self) -> list:
+        return list(self._items.values())
+
+    def handled(self, uid: int, key: str) -> bool:
+        return (uid, key) in self._done
+
+    def done(self, uid: int, key: str):
+        self._done.add((uid, key))
 
 # ---------- Reddit ----------
 async def process_reddit():
-    union_subs = union_user_subreddits()
-    union_authors = union_watch_users() | union_personal_watch_users()
-    if not union_subs and not union_authors:
+    all_subs = union_user_subreddits()
+    all_authors = union_watch_users() | union_personal_watch_users()
+    if not all_subs and not all_authors:
         return
 
     global_posts = []
     personal_posts = []
     author_posts  = []
 
+    # Only sources whose adaptive interval has elapsed
+    now = now_local().timestamp()
+    union_subs = _source_schedule.due("subreddit", all_subs, now)
+    union_authors = _source_schedule.due("redditor", _author_listing_due(all_authors, all_subs, now), now)
+    if not union_subs and not union_authors and not _quiet_holds:
+        return
+
+    rendered = {}  # each post is rendered once per variant and shared by every destination
+    cycle = CycleItems()
+    jobs = _subreddit_jobs(union_subs) + [("redditor", username, POST_LIMIT, _cursor_for("redditor", username)) for username in union_authors]
+    listings = _after_cursors(_fan_out_batches(await fetch_reddit_listings(jobs)))
+    now = now_local().timestamp()
+    for name in union_subs:
+        if ("subreddit", name) in listings:
+            _source_schedule.record("subreddit", name, (post.id for post in listings[("subreddit", name)]), now)
+        else:
+            _source_schedule.failed("subreddit", name, now)
+    for name in union_authors:
+        if ("redditor", name) in listings:
+            posts = listings[("redditor", name)]
+            # Covered authors show up in subreddit listings anyway; their own listing is just a safety net
+            if _author_covered(name, posts, all_subs):
+                _author_next_poll[name] = now + SourceScheduler.bounds()[1]
+            else:
+                _author_next_poll.pop(name, None)
+            _source_schedule.record("redditor", name, (post.id for post in posts), now)
+        else:
+            _source_schedule.failed("redditor", name, now)
+    for source, posts in listings.items():
+        for submission in posts:
+            if cycle.add(submission.id, submission, source):
+                _recent.add_reddit_post(submission)
+    # Posts held for users whose quiet hours just ended; seen IDs keep everyone else from a repeat
+    watched = {a.lower() for a in all_authors}
+    returning = [post for post in release_quiet_holds() if cycle.add(post.id, post, ("quiet", post.id))]
+
     # Subreddit-based collection
     for sub_name in union_subs:
-        try:
-            sr = reddit.subreddit(sub_name)
-            for submission in sr.new(limit=POST_LIMIT):
-                personal_posts.append((submission, sub_name))
-                if SUBREDDIT and sub_name == _norm_sub(SUBREDDIT):
-                    flair_ok = (not ALLOWED_FLAIRS) or (submission.link_flair_text in ALLOWED_FLAIRS)
-                    kw_ok = matches_keywords_post(submission, REDDIT_KEYWORDS)
-                    if flair_ok and kw_ok:
-                        global_posts.append(submission)
-        except Exception as e:
-            print(f"[ERROR] Fetch subreddit r/{sub_name}: {e}")
-
-    # Author-based collection
+        for submission in listings.get(("subreddit", sub_name), []):
+            personal_posts.append((submission, sub_name))
+            if SUBREDDIT and sub_name == _norm_sub(SUBREDDIT):
+                flair_ok = (not ALLOWED_FLAIRS) or (submission.link_flair_text in ALLOWED_FLAIRS)
+                kw_ok = matches_keywords_post(submission, REDDIT_KEYWORDS)
+                if flair_ok and kw_ok:
+                    global_posts.append(submission)
+    for submission in returning:
+        sub_name = _norm_sub(getattr(getattr(submission, "subreddit", None), "display_name", "") or "")
+        if sub_name in all_subs:
+            personal_posts.append((submission, sub_name))
+
+    # Author-based collection: watched authors' posts already pulled from subreddit listings,
+    # plus whatever their own listings returned, each post once
+    author_ids = set()
+    for sub_name in union_subs:
+        for submission in listings.get(("subreddit", sub_name), []):
+            if submission.author and str(submission.author).lower() in watched and submission.id not in author_ids:
+                author_ids.add(submission.id)
+                author_posts.append(submission)
     for username in union_authors:
-        try:
-            redditor = reddit.redditor(username)
-            for submission in redditor.submissions.new(limit=POST_LIMIT):
+        for submission in listings.get(("redditor", username), []):
+            if submission.id not in author_ids:
+                author_ids.add(submission.id)
                 author_posts.append(submission)
-        except Exception as e:
-            print(f"[ERROR] Fetch redditor u/{username}: {e}")
+    for submission in returning:
+        if submission.author and str(submission.author).lower() in watched and submission.id not in author_ids:
+            author_ids.add(submission.id)
+            author_posts.append(submission)
 
     # ---------- GLOBAL DELIVERY (subreddit-based only) ----------
     if SUBREDDIT:
@@ -780,156 +2842,243 @@ async def process_reddit():
             if post.id in get_global_seen("reddit"):
                 continue
             flair = post.link_flair_text if post.link_flair_text else "No Flair"
-            post_url = f"https://reddit.com{post.permalink}"
-            description = f"Subreddit: r/{_norm_sub(SUBREDDIT)}\nFlair: **{flair}**\nAuthor: u/{post.author}"
-            await send_webhook_embed(post.title, post_url, description, color=discord.Color.orange(), source_type="reddit")
+            item = _render_once(rendered, ("sub", post.id, _norm_sub(SUBREDDIT)), render_reddit_post, post, _norm_sub(SUBREDDIT))
+            await send_webhook_embed(item)
             flair_routed_channel_id = _route_channel_global_flair(flair)
             routed_channel_id = flair_routed_channel_id or _route_channel_global("reddit", post.title, getattr(post, "selftext", "") or "")
             if routed_channel_id:
-                await notify_channels_specific([routed_channel_id], post.title, post_url, description, color=discord.Color.orange(), source_type="reddit")
+                notify_channels_specific([routed_channel_id], item)
             else:
-                await notify_channels(post.title, post_url, description, color=discord.Color.orange(), source_type="reddit")
+                notify_channels(item)
             mark_global_seen("reddit", post.id)
             if ENABLE_DM and DISCORD_USER_IDS:
-                dm_text = f"[Reddit] r/{_norm_sub(SUBREDDIT)} • Flair: {flair} • u/{post.author}\n{post.title}\n{post_url}"
-                await notify_dms(dm_text)
+                notify_dms(item.dm_text)
+            _commit_item_marks()
 
     # ---------- PERSONAL DELIVERY (subreddit-based) ----------
     if user_prefs:
         for post, sub_name in reversed(personal_posts):
-            post_url = f"https://reddit.com{post.permalink}"
             flair = post.link_flair_text or "No Flair"
             sub_name_l = _norm_sub(sub_name)
             post_body = getattr(post, "selftext", "") or ""
-            for uid_str in list(user_prefs.keys()):
+            post_text = f"{post.title} {post_body}".lower()
+            # Only users subscribed to this subreddit (or following the global one by default)
+            for uid_str in _sub_index.users_for_subreddit(sub_name_l):
                 uid = int(uid_str)
-                p = get_user_prefs(uid)
+                p = get_user_record(uid)
 
-                user_subs = p.get("subreddits", [])
-                if user_subs:
-                    if sub_name_l not in set(user_subs):
-                        continue
-                else:
-                    if not SUBREDDIT or sub_name_l != _norm_sub(SUBREDDIT):
-                        continue
-
-                p_keywords = p.get("reddit_keywords", [])
-                if p_keywords and not matches_keywords_post(post, p_keywords):
+                if p.reddit_kw and not p.reddit_kw.matches(post_text):
                     continue
-                p_flairs = p.get("reddit_flairs", [])
-                if p_flairs and flair not in p_flairs:
+                if p.flairs and flair not in p.flairs:
                     continue
-                if is_quiet_now(uid):
+                if p.quiet_now():
+                    if post.id not in get_user_seen(uid, "reddit"):
+                        hold_for_quiet_hours(uid, post)
                     continue
-                if post.id in get_user_seen(uid, "reddit"):
+                if cycle.handled(uid, post.id) or post.id in get_user_seen(uid, "reddit"):
                     continue
+                cycle.done(uid, post.id)
 
                 # DUPLICATE GUARD: if user's personal destination is DM,
                 # and this post is from the GLOBAL subreddit, and user is in global DM list -> skip personal DM
-                dest_channel_id = p.get("preferred_channel_id")
-                personal_dest_is_dm = (not dest_channel_id) and p.get("enable_dm")
+                dest_channel_id = p.preferred_channel_id
+                personal_dest_is_dm = (not dest_channel_id) and p.enable_dm
                 if personal_dest_is_dm and SUBREDDIT and (sub_name_l == _norm_sub(SUBREDDIT)) and is_user_in_global_dm(uid):
                     # still mark seen so it doesn't show up later as personal duplicate
                     mark_user_seen(uid, "reddit", post.id)
                     continue
 
-                if p.get("digest","off") != "off":
-                    queue_digest_item(uid, {
-                        "type": "reddit",
-                        "title": post.title,
-                        "link": post_url,
-                        "subreddit": sub_name_l,
-                        "flair": flair,
-                        "author": str(post.author) if post.author else "unknown",
-                        "ts": now_local().isoformat(timespec="seconds")
-                    })
+                item = _render_once(rendered, ("sub", post.id, sub_name_l), render_reddit_post, post, sub_name_l)
+                if p.digest != "off":
+                    queue_digest_item(uid, item.digest_item)
                     mark_user_seen(uid, "reddit", post.id)
                     continue
 
                 # DM-only mode: personal deliveries only go to DMs (if enabled)
-                try:
-                    embed = build_source_embed(
-                        post.title,
-                        post_url,
-                        f"Subreddit: r/{sub_name_l}\nFlair: **{flair}**\nAuthor: u/{post.author}",
-                        color=discord.Color.orange(),
-                        source_type="reddit"
-                    )
-
-                    if p.get("enable_dm"):
-                        user = await client.fetch_user(uid)
-                        await user.send(embed=embed)
-
-                    mark_user_seen(uid, "reddit", post.id)
-                except Exception as e:
-                    print(f"[ERROR] Personal delivery to {uid}: {e}")
+                if p.enable_dm:
+                    notify_user_dm(uid, item)
+                mark_user_seen(uid, "reddit", post.id)
+            _commit_item_marks()
 
     # ---------- PERSONAL DELIVERY (author-based watches) ----------
     if user_prefs and author_posts:
         for post in reversed(author_posts):
-            post_url = f"https://reddit.com{post.permalink}"
             flair = post.link_flair_text or "No Flair"
             author = (str(post.author) if post.author else "unknown").lstrip("u/")
             sub_name_l = _norm_sub(getattr(getattr(post, "subreddit", None), "display_name", "") or "")
             post_body = getattr(post, "selftext", "") or ""
+            post_text = f"{post.title} {post_body}".lower()
 
-            for uid_str in list(user_prefs.keys()):
+            # Only users who actually watch this author (globally or personally)
+            for uid_str in _sub_index.users_for_author(author):
                 uid = int(uid_str)
-                p = get_user_prefs(uid)
-
-                # Only deliver to users who actually watch this author (globally or personally)
-                personal_list = set([u.strip().lstrip('u/') for u in p.get('watched_users', []) if u.strip()])
-                is_globally_watched = author in set(WATCH_USERS)
-                is_personally_watched = author in personal_list
-                if not (is_globally_watched or is_personally_watched):
-                    continue
+                p = get_user_record(uid)
 
                 # Subreddit bypass control
-                if not p.get("watch_bypass_subs", True):
-                    user_subs = p.get("subreddits", [])
-                    if user_subs and sub_name_l and sub_name_l not in set(user_subs):
+                if not p.watch_bypass_subs:
+                    if p.subreddits and sub_name_l and sub_name_l not in p.subreddits:
                         continue
                 # Flair bypass control
-                if not p.get("watch_bypass_flairs", True):
-                    p_flairs = p.get("reddit_flairs", [])
-                    if p_flairs and flair not in p_flairs:
+                if not p.watch_bypass_flairs:
+                    if p.flairs and flair not in p.flairs:
                         continue
                 # Keywords bypass control
-                if not p.get("watch_bypass_keywords", False):
-                    p_keywords = p.get("reddit_keywords", [])
-                    if p_keywords and not matches_keywords_post(post, p_keywords):
+                if not p.watch_bypass_keywords:
+                    if p.reddit_kw and not p.reddit_kw.matches(post_text):
                         continue
 
-                if is_quiet_now(uid):
+                if p.quiet_now():
+                    if post.id not in get_user_seen(uid, "reddit"):
+                        hold_for_quiet_hours(uid, post)
                     continue
-                if post.id in get_user_seen(uid, "reddit"):
+                if cycle.handled(uid, post.id) or post.id in get_user_seen(uid, "reddit"):
                     continue
+                cycle.done(uid, post.id)
 
-                if p.get("digest","off") != "off":
-                    queue_digest_item(uid, {
-                        "type": "reddit",
-                        "title": post.title,
-                        "link": post_url,
-                        "subreddit": sub_name_l or "(various)",
-                        "flair": flair,
-                        "author": author,
-                        "ts": now_local().isoformat(timespec="seconds")
-                    })
+                item = _render_once(rendered, ("author", post.id), render_reddit_author_post, post, author, sub_name_l)
+                if p.digest != "off":
+                    queue_digest_item(uid, item.digest_item)
                     mark_user_seen(uid, "reddit", post.id)
                     continue
 
                 # DM-only mode: personal deliveries only go to DMs (if enabled)
-                try:
-                    desc = f"Author: u/{author}\nSubreddit: r/{sub_name_l or 'unknown'}\nFlair: **{flair}**"
-                    embed = build_source_embed(post.title, post_url, desc, color=discord.Color.orange(), source_type="reddit")
+                if p.enable_dm:
+                    notify_user_dm(uid, item)
+                mark_user_seen(uid, "reddit", post.id)
+            _commit_item_marks()
+
+    # Every delivered post's seen marks are committed; only now may the cursors move past them
+    _advance_cursors(listings)
+
+# ---------- RSS fetch engine ----------
+# Feeds are downloaded concurrently over one pooled aiohttp session. ETag/Last-Modified
+# validators are kept per feed so unchanged feeds answer 304 and are never re-parsed; the
+# last parsed entries are kept in memory and reused for the rest of the pipeline. A feed's
+# first fetch in a process is unconditional, since a 304 would then have nothing to reuse.
+RSS_CACHE_PATH = DATA_DIR / "rss_cache.json"  # { feed_url: {"etag": "...", "last_modified": "..."} }
+_rss_validators = _load_state_doc("rss_cache", RSS_CACHE_PATH, {})
+if not isinstance(_rss_validators, dict):
+    _rss_validators = {}
+_rss_entries: dict[str, tuple[str, list]] = {}  # feed_url -> (feed_title, entries) from the last 200 response
+_http_session: aiohttp.ClientSession | None = None
+
+def _save_rss_validators():
+    _state_writer.mark("rss_cache")
+
+_state_writer.register("rss_cache", RSS_CACHE_PATH, lambda: _compact_json(_rss_validators))
+
+def _get_http_session() -> aiohttp.ClientSession:
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(limit=max(1, RSS_FETCH_CONCURRENCY), limit_per_host=max(1, RSS_PER_HOST_LIMIT), ttl_dns_cache=300)
+        _http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=RSS_FETCH_TIMEOUT),
+            headers={"User-Agent": RSS_USER_AGENT},
+        )
+    return _http_session
 
-                    if p.get("enable_dm"):
-                        user = await client.fetch_user(uid)
-                        await user.send(embed=embed)
+async def close_http_sessions():
+    """Close the RSS and webhook sessions on shutdown (avoids "Unclosed client session")."""
+    for session in (_http_session, _webhook_session):
+        if session is not None and not session.closed:
+            await session.close()
 
-                    mark_user_seen(uid, "reddit", post.id)
-                except Exception as e:
-                    print(f"[ERROR] Personal author-watch delivery to {uid}: {e}")
+def _parsed_feed_title(parsed, feed_url: str) -> str:
+    return parsed.feed.get("title", domain_from_url(feed_url)) if hasattr(parsed, "feed") else domain_from_url(feed_url)
+
+# feed_url -> (Cache-Control max-age seconds, RSS <ttl> seconds, <skipHours> set in GMT)
+_rss_poll_hints: dict[str, tuple[int, int, frozenset]] = {}
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)", re.I)
+_SKIP_HOURS_RE = re.compile(rb"<skipHours>(.*?)</skipHours>", re.S | re.I)
+_HOUR_RE = re.compile(rb"<hour>\s*(\d{1,2})\s*</hour>", re.I)
+
+def _max_age_seconds(cache_control: str | None) -> int:
+    m = _MAX_AGE_RE.search(cache_control or "")
+    return int(m.group(1)) if m else 0
+
+def _feed_ttl_seconds(parsed) -> int:
+    try:
+        return int(parsed.feed.get("ttl") or 0) * 60
+    except (TypeError, ValueError):
+        return 0
+
+def _feed_skip_hours(body: bytes) -> frozenset:
+    # feedparser keeps only the last <hour>, so read the block directly
+    m = _SKIP_HOURS_RE.search(body or b"")
+    if not m:
+        return frozenset()
+    return frozenset(h for h in (int(x) for x in _HOUR_RE.findall(m.group(1))) if 0 <= h < 24)
+
+async def fetch_feed(feed_url: str, conditional: bool = True) -> tuple[str, list] | None:
+    """
+    Fetch and parse one feed. Returns (feed_title, entries) or None on failure.
+    A 304 reuses the entries parsed earlier in this process. Until a feed has been parsed
+    once (e.g. after a restart) it is fetched unconditionally, so held-back items and new
+    subscribers to it still get its current entries.
+    conditional=False (lookups like /why) always downloads the full feed and leaves the
+    poller's validators, cached entries and poll hints untouched.
+    """
+    if urlparse(feed_url).scheme not in ("http", "https"):
+        # Local files and other feedparser-supported sources
+        parsed = await asyncio.to_thread(feedparser.parse, feed_url)
+        return _parsed_feed_title(parsed, feed_url), list(parsed.entries[:RSS_LIMIT])
+
+    headers = {}
+    validators = (_rss_validators.get(feed_url) or {}) if conditional and feed_url in _rss_entries else {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    session = _get_http_session()
+    async with session.get(feed_url, headers=headers) as resp:
+        max_age = _max_age_seconds(resp.headers.get("Cache-Control"))
+        if resp.status == 304:
+            ttl, skip_hours = _rss_poll_hints.get(feed_url, (0, 0, frozenset()))[1:]
+            _rss_poll_hints[feed_url] = (max_age, ttl, skip_hours)
+            return _rss_entries.get(feed_url, (domain_from_url(feed_url), []))
+        resp.raise_for_status()
+        body = await resp.read()
+        response_headers = {k.lower(): v for k, v in resp.headers.items()}
+        response_headers.setdefault("content-location", str(resp.url))
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+
+    parsed = await asyncio.to_thread(feedparser.parse, body, response_headers=response_headers)
+    result = (_parsed_feed_title(parsed, feed_url), list(parsed.entries[:RSS_LIMIT]))
+    if not conditional:
+        return result
+    _rss_entries[feed_url] = result
+    _rss_poll_hints[feed_url] = (max_age, _feed_ttl_seconds(parsed), _feed_skip_hours(body))
+    if etag or last_modified:
+        _rss_validators[feed_url] = {k: v for k, v in (("etag", etag), ("last_modified", last_modified)) if v}
+    else:
+        _rss_validators.pop(feed_url, None)
+    return result
+
+async def fetch_feeds(feed_urls, conditional: bool = True) -> dict:
+    """
+    Fetch many feeds concurrently (bounded by RSS_FETCH_CONCURRENCY, RSS_PER_HOST_LIMIT per host).
+    Returns {feed_url: (feed_title, entries)}; failed feeds are omitted.
+    """
+    sem = asyncio.Semaphore(max(1, RSS_FETCH_CONCURRENCY))
+    results = {}
+    before = json.dumps(_rss_validators, sort_keys=True)
+
+    async def _one(feed_url: str):
+        async with sem:
+            try:
+                fetched = await fetch_feed(feed_url, conditional)
+                if fetched is not None:
+                    results[feed_url] = fetched
+            except Exception as e:
+                print(f"[ERROR] Failed to parse RSS feed {feed_url}: {e}")
+
+    await asyncio.gather(*(_one(u) for u in feed_urls))
+    if json.dumps(_rss_validators, sort_keys=True) != before:
+        _save_rss_validators()
+    return results
 
 # ---------- RSS ----------
 async def process_rss():
@@ -938,129 +3087,101 @@ async def process_rss():
         feeds_union = set(RSS_FEEDS)
 
     global_items = []
-    personal_items = []
+    rendered = {}  # each entry is rendered once and shared by every destination
+    cycle = CycleItems()
+
+    # Only feeds whose adaptive interval (and ttl/Cache-Control/skipHours) has elapsed
+    feeds_union = _source_schedule.due("feed", feeds_union, now_local().timestamp())
+    if not feeds_union:
+        return
 
+    feeds = await fetch_feeds(feeds_union)
+    now = now_local().timestamp()
     for feed_url in feeds_union:
-        try:
-            parsed = feedparser.parse(feed_url)
-            feed_title = parsed.feed.get("title", domain_from_url(feed_url)) if hasattr(parsed, "feed") else domain_from_url(feed_url)
-            count = 0
-            for entry in parsed.entries:
-                if count >= RSS_LIMIT:
-                    break
-                entry_id = entry.get("id") or entry.get("link") or f"{entry.get('title','')}-{entry.get('published','')}"
-                if not entry_id:
-                    continue
-                title = entry.get("title", "Untitled")
-                link = entry.get("link", feed_url)
-                summary = entry.get("summary", "") or entry.get("description", "")
-                text_for_match = f"{title}\n{summary}"
-
-                personal_items.append({
-                    "feed_title": feed_title,
-                    "title": title,
-                    "link": link,
-                    "summary": summary,
-                    "id": entry_id,
-                    "feed_url": feed_url
-                })
-                if feed_url in RSS_FEEDS and matches_keywords_text(text_for_match, RSS_KEYWORDS):
-                    global_items.append({
-                        "feed_title": feed_title,
-                        "title": title,
-                        "link": link,
-                        "summary": summary,
-                        "id": entry_id,
-                        "feed_url": feed_url
-                    })
-                count += 1
-        except Exception as e:
-            print(f"[ERROR] Failed to parse RSS feed {feed_url}: {e}")
+        if feed_url not in feeds:
+            _source_schedule.failed("feed", feed_url, now)
+            continue
+        max_age, ttl, skip_hours = _rss_poll_hints.get(feed_url, (0, 0, frozenset()))
+        entry_ids = (e.get("id") or e.get("link") or e.get("title", "") for e in feeds[feed_url][1])
+        _source_schedule.record("feed", feed_url, entry_ids, now, max(max_age, ttl), skip_hours)
+    # Global feeds first, so an article they share with personal feeds keeps the global feed's version
+    for feed_url in sorted(feeds_union, key=lambda u: (u not in RSS_FEEDS, u)):
+        if feed_url not in feeds:
+            continue
+        feed_title, entries = feeds[feed_url]
+        count = 0
+        for entry in entries:
+            if count >= RSS_LIMIT:
+                break
+            item = _rss_item_from_entry(feed_url, feed_title, entry)
+            if item is None:
+                continue
+            _recent.add_rss_item(item)
+            link = _normalize_link(entry["link"]) if entry.get("link") else None
+            cycle.add(cycle.canonical(item["id"], link, feed_url), item, feed_url, item["id"])
+            count += 1
+    personal_items = cycle.items()
+    for item, feed_urls, ids in personal_items:
+        if any(f in RSS_FEEDS for f in feed_urls) and matches_keywords_text(f"{item['title']}\n{item['summary']}", RSS_KEYWORDS):
+            global_items.append((item, ids))
 
     # GLOBAL DELIVERY
-    for item in reversed(global_items):
-        if item["id"] in get_global_seen("rss"):
+    global_seen = get_global_seen("rss")
+    for item, ids in reversed(global_items):
+        # A merged article counts as seen under any feed's entry ID, and is marked under all of them
+        if any(i in global_seen for i in ids):
             continue
-        feed_title = item["feed_title"]
-        title = item["title"]
-        link = item["link"]
-        summary = item["summary"] or ""
-        clean_summary = re.sub(r"<[^>]+>", "", summary)
-        if len(clean_summary) > 500:
-            clean_summary = clean_summary[:497] + "..."
-        description = f"Feed: **{feed_title}**\nSource: {domain_from_url(link)}\n\n{clean_summary}"
-        await send_webhook_embed(title, link, description, color=discord.Color.blurple(), source_type="rss")
-        routed_channel_id = _route_channel_global("rss", title, summary)
+        rendered_item = _render_once(rendered, item["id"], render_rss_item, item)
+        await send_webhook_embed(rendered_item)
+        routed_channel_id = _route_channel_global("rss", item["title"], item["summary"] or "")
         if routed_channel_id:
-            await notify_channels_specific([routed_channel_id], title, link, description, color=discord.Color.blurple(), source_type="rss")
+            notify_channels_specific([routed_channel_id], rendered_item)
         else:
-            await notify_channels(title, link, description, color=discord.Color.blurple(), source_type="rss")
-        mark_global_seen("rss", item["id"])
+            notify_channels(rendered_item)
+        for i in ids:
+            mark_global_seen("rss", i)
         if ENABLE_DM and DISCORD_USER_IDS:
-            dm_text = f"[RSS] {feed_title}\n{title}\n{link}"
-            await notify_dms(dm_text)
+            notify_dms(rendered_item.dm_text)
+        _commit_item_marks()
 
     # PERSONAL DELIVERY
     if user_prefs:
-        for item in reversed(personal_items):
-            feed_title = item["feed_title"]
-            title = item["title"]
-            link = item["link"]
-            summary = item["summary"] or ""
-            clean_summary = re.sub(r"<[^>]+>", "", summary)
-            if len(clean_summary) > 500:
-                clean_summary = clean_summary[:497] + "..."
-            description = f"Feed: **{feed_title}**\nSource: {domain_from_url(link)}\n\n{clean_summary}"
-            text_for_match = f"{title}\n{summary}"
-            feed_url = item["feed_url"]
-
-            for uid_str in list(user_prefs.keys()):
+        for item, feed_urls, ids in reversed(personal_items):
+            text_for_match = f"{item['title']}\n{item['summary'] or ''}".lower()
+            from_global_feed = any(f in RSS_FEEDS for f in feed_urls)
+
+            # Only users with one of these feeds in /myfeeds, once each
+            for uid_str in set().union(*(_sub_index.users_for_feed(f) for f in feed_urls)):
                 uid = int(uid_str)
-                p = get_user_prefs(uid)
-                user_feeds = [u.strip() for u in p.get("feeds", []) if u.strip()]
-                if user_feeds and feed_url not in user_feeds:
-                    continue
-                if not user_feeds:
-                    continue
-                p_rss_kw = p.get("rss_keywords", [])
-                if p_rss_kw and not matches_keywords_text(text_for_match, p_rss_kw):
+                p = get_user_record(uid)
+                if p.rss_kw and not p.rss_kw.matches(text_for_match):
                     continue
-                if is_quiet_now(uid):
+                if p.quiet_now():
                     continue
-                if item["id"] in get_user_seen(uid, "rss"):
+                seen = get_user_seen(uid, "rss")
+                if any(i in seen for i in ids):
                     continue
 
                 # DUPLICATE GUARD for RSS:
                 # If user's personal destination is DM, and this item comes from a GLOBAL RSS feed,
                 # and the user is in global DM list -> skip personal DM (avoid duplicate)
-                dest_channel_id = p.get("preferred_channel_id")
-                personal_dest_is_dm = (not dest_channel_id) and p.get("enable_dm")
-                if personal_dest_is_dm and (feed_url in RSS_FEEDS) and is_user_in_global_dm(uid):
-                    mark_user_seen(uid, "rss", item["id"])
+                dest_channel_id = p.preferred_channel_id
+                personal_dest_is_dm = (not dest_channel_id) and p.enable_dm
+                if personal_dest_is_dm and from_global_feed and is_user_in_global_dm(uid):
+                    for i in ids:
+                        mark_user_seen(uid, "rss", i)
                     continue
 
-                if p.get("digest","off") != "off":
-                    queue_digest_item(uid, {
-                        "type": "rss",
-                        "title": title,
-                        "link": link,
-                        "feed_title": feed_title,
-                        "ts": now_local().isoformat(timespec="seconds")
-                    })
-                    mark_user_seen(uid, "rss", item["id"])
-                    continue
-
-                # DM-only mode: personal deliveries only go to DMs (if enabled)
-                try:
-                    embed = build_source_embed(title, link, description, color=discord.Color.blurple(), source_type="rss")
-
-                    if p.get("enable_dm"):
-                        user = await client.fetch_user(uid)
-                        await user.send(embed=embed)
-
-                    mark_user_seen(uid, "rss", item["id"])
-                except Exception as e:
-                    print(f"[ERROR] Personal RSS delivery to {uid}: {e}")
+                rendered_item = _render_once(rendered, item["id"], render_rss_item, item)
+                if p.digest != "off":
+                    queue_digest_item(uid, rendered_item.digest_item)
+                else:
+                    # DM-only mode: personal deliveries only go to DMs (if enabled)
+                    if p.enable_dm:
+                        notify_user_dm(uid, rendered_item)
+                for i in ids:
+                    mark_user_seen(uid, "rss", i)
+            _commit_item_marks()
 
 # ---------- Scheduler ----------
 async def fetch_and_notify():
@@ -1074,60 +3195,74 @@ async def fetch_and_notify():
             await process_rss()
         except Exception as e:
             print(f"[ERROR] RSS fetch failed: {e}")
-        await asyncio.sleep(CHECK_INTERVAL)
+        flush_cycle_marks()
+        await _state_writer.flush()
+        await asyncio.sleep(poll_tick_seconds())
+
+async def send_digest(uid: int):
+    p = get_user_record(uid)
+    items = pop_all_digest_items(uid)
+    if not items:
+        return
+
+    # DM-only mode: digests deliver only to DMs (if enabled)
+    if not p.enable_dm:
+        return
+    dest_user = None
+    try:
+        dest_user = await get_dm_channel(uid)
+    except Exception as e:
+        print(f"[ERROR] Resolving DM destination for {uid}: {e}")
+        return
+
+    def format_line(it):
+        if it.get("type") == "reddit":
+            sub = it.get("subreddit","?")
+            return f"• [Reddit] r/{sub} — {it.get('title','(no title)')}\n{it.get('link','')}"
+        else:
+            feed = it.get("feed_title","Feed")
+            return f"• [RSS] {feed} — {it.get('title','(no title)')}\n{it.get('link','')}"
+
+    lines = [format_line(it) for it in items]
+    CHUNK = 20
+    chunks = [lines[i:i+CHUNK] for i in range(0, len(lines), CHUNK)]
+
+    for idx, block in enumerate(chunks, start=1):
+        desc = "\n".join(block)
+        title = "Your Daily Digest" if p.digest == "daily" else f"Your Weekly Digest ({p.digest_day.capitalize()})"
+        title = f"{title} — Part {idx}/{len(chunks)}" if len(chunks) > 1 else title
+        embed = make_embed(title, desc, discord.Color.gold())
+        try:
+            if dest_user:
+                await dest_user.send(embed=embed)
+        except Exception as e:
+            print(f"[ERROR] Sending digest to {uid}: {e}")
 
 async def digest_scheduler():
+    """Sleeps until the earliest due digest; /setdigest and /settimezone wake it to reschedule."""
     await client.wait_until_ready()
+    reschedule_all_digests()
     while not client.is_closed():
+        _digest_wakeup.clear()
+        now_ts = now_local().timestamp()
+        if not _digest_heap or _digest_heap[0][0] > now_ts:
+            # Capped so a wall-clock jump is noticed within a few minutes
+            timeout = min(_digest_heap[0][0] - now_ts, 300) if _digest_heap else 300
+            try:
+                await asyncio.wait_for(_digest_wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        _, uid, gen = heapq.heappop(_digest_heap)
+        if _digest_gen.get(uid) != gen:
+            continue
         try:
-            for uid_str in list(user_prefs.keys()):
-                uid = int(uid_str)
-                p = get_user_prefs(uid)
-                if p.get("digest","off") == "off":
-                    continue
-                if not should_send_digest(uid):
-                    continue
-                items = pop_all_digest_items(uid)
-                if not items:
-                    mark_digest_sent(uid)
-                    continue
-
-                # DM-only mode: digests deliver only to DMs (if enabled)
-                if not p.get("enable_dm"):
-                    continue
-                dest_user = None
-                try:
-                    dest_user = await client.fetch_user(uid)
-                except Exception as e:
-                    print(f"[ERROR] Resolving DM destination for {uid}: {e}")
-                    continue
-
-                def format_line(it):
-                    if it.get("type") == "reddit":
-                        sub = it.get("subreddit","?")
-                        return f"• [Reddit] r/{sub} — {it.get('title','(no title)')}\n{it.get('link','')}"
-                    else:
-                        feed = it.get("feed_title","Feed")
-                        return f"• [RSS] {feed} — {it.get('title','(no title)')}\n{it.get('link','')}"
-
-                lines = [format_line(it) for it in items]
-                CHUNK = 20
-                chunks = [lines[i:i+CHUNK] for i in range(0, len(lines), CHUNK)]
-
-                for idx, block in enumerate(chunks, start=1):
-                    desc = "\n".join(block)
-                    title = "Your Daily Digest" if p.get("digest") == "daily" else f"Your Weekly Digest ({p.get('digest_day').capitalize()})"
-                    title = f"{title} — Part {idx}/{len(chunks)}" if len(chunks) > 1 else title
-                    embed = make_embed(title, desc, discord.Color.gold())
-                    try:
-                        if dest_user:
-                            await dest_user.send(embed=embed)
-                    except Exception as e:
-                        print(f"[ERROR] Sending digest to {uid}: {e}")
-                mark_digest_sent(uid)
+            await send_digest(uid)
         except Exception as e:
             print(f"[ERROR] digest_scheduler: {e}")
-        await asyncio.sleep(60)
+        finally:
+            mark_digest_sent(uid)
+            schedule_digest(uid)
 
 # ---------- Auth ----------
 
@@ -1190,6 +3325,33 @@ async def setwebhook(interaction: discord.Interaction, url: str = ""):
     shown = WEBHOOK_URL if WEBHOOK_URL else "None"
     await interaction.response.send_message(embed=make_embed("Webhook Updated", f"Webhook URL set to: `{shown}`"), ephemeral=True)
 
+@tree.command(name="addwebhook", description="(Admin) Add an extra webhook URL for global posts (source: all, reddit or rss).")
+@app_commands.choices(source=[app_commands.Choice(name="all", value="all"), app_commands.Choice(name="reddit", value="reddit"), app_commands.Choice(name="rss", value="rss")])
+async def addwebhook(interaction: discord.Interaction, url: str, source: str = "all"):
+    if not is_admin(interaction):
+        return await interaction.response.send_message(embed=make_embed("Unauthorized", "You are not authorized."), ephemeral=True)
+    url = (url or "").strip()
+    source = (source or "all").strip().lower()
+    if not url or "," in url or "|" in url:
+        return await interaction.response.send_message(embed=make_embed("Invalid URL", "Provide a single webhook URL."), ephemeral=True)
+    if source not in ("all", "reddit", "rss"):
+        return await interaction.response.send_message(embed=make_embed("Invalid", "source must be: all, reddit or rss"), ephemeral=True)
+    WEBHOOK_URLS[:] = [(u, s) for u, s in WEBHOOK_URLS if u != url] + [(url, source)]
+    update_env_var("DISCORD_WEBHOOK_URLS", ",".join(u if s == "all" else f"{u}|{s}" for u, s in WEBHOOK_URLS))
+    await interaction.response.send_message(embed=make_embed("Webhook Added", f"Now posting **{source}** items to: `{url}`"), ephemeral=True)
+
+@tree.command(name="removewebhook", description="(Admin) Remove an extra webhook URL.")
+async def removewebhook(interaction: discord.Interaction, url: str):
+    if not is_admin(interaction):
+        return await interaction.response.send_message(embed=make_embed("Unauthorized", "You are not authorized."), ephemeral=True)
+    url = (url or "").strip()
+    before = len(WEBHOOK_URLS)
+    WEBHOOK_URLS[:] = [(u, s) for u, s in WEBHOOK_URLS if u != url]
+    if len(WEBHOOK_URLS) == before:
+        return await interaction.response.send_message(embed=make_embed("Not Found", "That URL isn't in the extra webhook list."), ephemeral=True)
+    update_env_var("DISCORD_WEBHOOK_URLS", ",".join(u if s == "all" else f"{u}|{s}" for u, s in WEBHOOK_URLS))
+    await interaction.response.send_message(embed=make_embed("Webhook Removed", f"Stopped posting to: `{url}`"), ephemeral=True)
+
 @tree.command(name="setflairs", description="Set allowed flairs for the global subreddit pipeline.")
 async def setflairs(interaction: discord.Interaction, flairs: str = ""):
     if not is_admin(interaction):
@@ -1281,6 +3443,7 @@ async def settimezone(interaction: discord.Interaction, tz: str):
     TZ_NAME = tz
     TZ = _safe_zoneinfo(TZ_NAME)
     update_env_var("TIMEZONE", TZ_NAME)
+    reschedule_all_digests()
     await interaction.response.send_message(embed=make_embed("Timezone Updated", f"Default timezone is now **{TZ_NAME}**"), ephemeral=True)
 
 @tree.command(name="adduserwatch", description="(Admin) Add a Reddit username to the global watch list.")
@@ -1312,12 +3475,22 @@ async def listuserwatches(interaction: discord.Interaction):
     users = ", ".join([f"u/{u}" for u in WATCH_USERS]) if WATCH_USERS else "None"
     await interaction.response.send_message(embed=make_embed("Watched Users", users), ephemeral=True)
 
-@tree.command(name="reloadenv", description="Restart process to reload .env values.")
-async def reloadenv(interaction: discord.Interaction):
+@tree.command(name="reloadenv", description="Reload .env values in place (restart:true restarts the process).")
+async def reloadenv(interaction: discord.Interaction, restart: bool = False):
     if not is_admin(interaction):
         return await interaction.response.send_message(embed=make_embed("Unauthorized", "You are not authorized."), ephemeral=True)
-    await interaction.response.send_message(embed=make_embed("Reloading", "Restarting process..."), ephemeral=True)
-    os.execv(sys.executable, [sys.executable, __file__])
+    if restart:
+        await interaction.response.send_message(embed=make_embed("Reloading", "Restarting process..."), ephemeral=True)
+        _state_writer.flush_now()
+        os.execv(sys.executable, [sys.executable, __file__])
+    try:
+        changed, needs_restart = reload_env()
+    except Exception as e:
+        return await interaction.response.send_message(embed=make_embed("Reload Failed", f"Nothing was changed: {e}"), ephemeral=True)
+    lines = [f"Updated: **{', '.join(changed)}**" if changed else "No live settings changed."]
+    if needs_restart:
+        lines.append(f"Changed but need `/reloadenv restart:true`: **{', '.join(needs_restart)}**")
+    await interaction.response.send_message(embed=make_embed("Reloaded", "\n".join(lines)), ephemeral=True)
 
 @tree.command(name="whereenv", description="Show path to the .env file.")
 async def whereenv(interaction: discord.Interaction):
@@ -1410,6 +3583,7 @@ async def status(interaction: discord.Interaction):
     flair_list = ", ".join(ALLOWED_FLAIRS) if ALLOWED_FLAIRS else "ALL"
     dm_status = "enabled" if ENABLE_DM else "disabled"
     webhook_text = WEBHOOK_URL if WEBHOOK_URL else "None"
+    extra_webhooks = ", ".join(f"`{u}` ({s})" for u, s in WEBHOOK_URLS) if WEBHOOK_URLS else "None"
     dm_users = ", ".join(DISCORD_USER_IDS) if DISCORD_USER_IDS else "None"
     reddit_kw = ", ".join(REDDIT_KEYWORDS) if REDDIT_KEYWORDS else "ALL"
     rss_kw = ", ".join(RSS_KEYWORDS) if RSS_KEYWORDS else "ALL"
@@ -1417,6 +3591,8 @@ async def status(interaction: discord.Interaction):
     chan_text = ", ".join(DISCORD_CHANNEL_IDS) if DISCORD_CHANNEL_IDS else "None"
     sub_text = f"r/{_norm_sub(SUBREDDIT)}" if SUBREDDIT else "None"
     watch_text = ", ".join([f"u/{u}" for u in WATCH_USERS]) if WATCH_USERS else "None"
+    queued = _delivery.counts()
+    writes = _state_writer.totals()
     msg = (
         f"Monitoring: **{sub_text}** every **{CHECK_INTERVAL}s**.\n"
         f"Reddit Post limit: **{POST_LIMIT}**.\n"
@@ -1425,25 +3601,54 @@ async def status(interaction: discord.Interaction):
         f"RSS Keywords (GLOBAL): **{rss_kw}**.\n"
         f"DMs (GLOBAL): **{dm_status}** (Users: {dm_users}).\n"
         f"Webhook: `{webhook_text}`\n"
+        f"Extra webhooks: {extra_webhooks}\n"
         f"Channels: **{chan_text}**\n"
         f"RSS Feeds:\n{rss_text}\n"
         f"Watched users (GLOBAL): **{watch_text}**\n"
         f"Thread mode (GLOBAL): **{GLOBAL_THREAD_MODE}** (TTL: {THREAD_TTL_HOURS}h)\n"
-        f"Timezone: **{TZ_NAME}**"
+        f"Polling: **{_source_schedule.summary(now_local().timestamp())}**\n"
+        f"Timezone: **{TZ_NAME}**\n"
+        f"Delivery queue: **{queued.get('pending', 0) + queued.get('inflight', 0)}** pending, **{queued.get('dead', 0)}** dead-lettered "
+        f"(sent: {sum(st['sent'] for st in _delivery_stats.values())}, failed: {sum(st['failed'] for st in _delivery_stats.values())}; see /deliverystats)\n"
+        f"DM cache: **{len(_dm_cache)}** users (hits: {_dm_cache_stats['hits']}, misses: {_dm_cache_stats['misses']})\n"
+        f"State ({'state.db' if _state_db else 'JSON files'}) writes: **{writes['writes']}** ({writes['bytes'] / 1024:.1f} KiB, failed: {writes['failed']}, pending: {writes['dirty']})"
     )
     await interaction.response.send_message(embed=make_embed("Bot Status", msg), ephemeral=True)
 
+@tree.command(name="deliverystats", description="(Admin) Show per-destination delivery latency and failures.")
+async def deliverystats(interaction: discord.Interaction):
+    if not is_admin(interaction):
+        return await interaction.response.send_message(embed=make_embed("Unauthorized", "You are not authorized."), ephemeral=True)
+    if not _delivery_stats:
+        return await interaction.response.send_message(embed=make_embed("Delivery Stats", "No deliveries since startup."), ephemeral=True)
+    # Slowest destinations first; failures always shown
+    rows = sorted(
+        _delivery_stats.items(),
+        key=lambda kv: (kv[1]["failed"] == 0, -(kv[1]["total_ms"] / kv[1]["sent"] if kv[1]["sent"] else 0)),
+    )
+    lines = []
+    for dest, st in rows[:25]:
+        avg = st["total_ms"] / st["sent"] if st["sent"] else 0
+        line = f"`{dest}` — sent {st['sent']}, failed {st['failed']}, avg {avg:.0f} ms, max {st['max_ms']:.0f} ms"
+        if st["failed"] and st["last_error"]:
+            line += f"\n  last error: {st['last_error']}"
+        lines.append(line)
+    if len(rows) > 25:
+        lines.append(f"…and {len(rows) - 25} more destinations")
+    await interaction.response.send_message(embed=make_embed("Delivery Stats", "\n".join(lines)[:4000]), ephemeral=True)
+
 @tree.command(name="help", description="Show help for all commands.")
 async def help_cmd(interaction: discord.Interaction):
     commands_text = "\n".join([
         "Admin:",
         "/setsubreddit, /setinterval, /setpostlimit",
-        "/setwebhook, /setflairs, /setredditkeywords, /setrsskeywords, /setkeywords",
+        "/setwebhook, /addwebhook, /removewebhook",
+        "/setflairs, /setredditkeywords, /setrsskeywords, /setkeywords",
         "/setrssfeeds",
         "/enabledms, /adddmuser, /removedmuser",
         "/addchannel, /removechannel, /listchannels",
         "/adduserwatch, /removeuserwatch, /listuserwatches",
-        "/settimezone, /status, /reloadenv, /whereenv",
+        "/settimezone, /status, /deliverystats, /reloadenv, /whereenv",
         "/setthreadmode, /setthreadttl",
         "/whyglobal <url>",
         "",
@@ -1931,9 +4136,9 @@ def _explain_reddit_for_user(uid: int, post) -> str:
     # Keywords
     p_keywords = p.get("reddit_keywords", [])
     if p_keywords:
-        if matches_keywords_post(post, p_keywords):
-            kw_hit = _first_matching_keyword(f"{title} {body}", p_keywords)
-            reasons.append(f"✅ Keyword match: {kw_hit or '(matched)'}")
+        kw_hit = _first_matching_keyword(f"{title} {body}", p_keywords)
+        if kw_hit:
+            reasons.append(f"✅ Keyword match: {kw_hit}")
         else:
             blockers.append("❌ Keyword mismatch (your personal Reddit keywords did not match)")
     else:
@@ -1985,31 +4190,26 @@ def _explain_reddit_for_user(uid: int, post) -> str:
     return header + detail
 
 async def _find_rss_item_by_link(url: str):
+    item = _recent.rss_item(url)
+    if item is not None:
+        return item
+    # Miss: fetch the feeds on the item's host first, then the rest. Unconditional, so a
+    # feed answering 304 still yields its entries and the poller's state stays as it was.
     feeds_union = union_user_feeds()
-    for feed_url in feeds_union:
-        try:
-            parsed = feedparser.parse(feed_url)
-            feed_title = parsed.feed.get("title", domain_from_url(feed_url)) if hasattr(parsed, "feed") else domain_from_url(feed_url)
-            count = 0
-            for entry in parsed.entries:
-                if count >= RSS_LIMIT:
-                    break
-                link = entry.get("link", "")
-                if link and link.strip() == url.strip():
-                    title = entry.get("title", "Untitled")
-                    summary = entry.get("summary", "") or entry.get("description", "")
-                    entry_id = entry.get("id") or link or f"{title}-{entry.get('published','')}"
-                    return {
-                        "feed_url": feed_url,
-                        "feed_title": feed_title,
-                        "title": title,
-                        "link": link,
-                        "summary": summary,
-                        "id": entry_id,
-                    }
-                count += 1
-        except Exception:
+    host = _normalize_link(url).split("/", 1)[0]
+    same_host = [f for f in feeds_union if _normalize_link(f).split("/", 1)[0] == host]
+    others = [f for f in feeds_union if f not in same_host]
+    for targets in (same_host, others):
+        if not targets:
             continue
+        for feed_url, (feed_title, entries) in (await fetch_feeds(targets, conditional=False)).items():
+            for entry in entries[:RSS_LIMIT]:
+                found = _rss_item_from_entry(feed_url, feed_title, entry)
+                if found is not None:
+                    _recent.add_rss_item(found)
+        item = _recent.rss_item(url)
+        if item is not None:
+            return item
     return None
 
 def _explain_rss_for_user(uid: int, item: dict) -> str:
@@ -2031,9 +4231,9 @@ def _explain_rss_for_user(uid: int, item: dict) -> str:
 
     p_rss_kw = p.get("rss_keywords", [])
     if p_rss_kw:
-        if matches_keywords_text(text_for_match, p_rss_kw):
-            kw_hit = _first_matching_keyword(text_for_match, p_rss_kw)
-            reasons.append(f"✅ Keyword match: {kw_hit or '(matched)'}")
+        kw_hit = _first_matching_keyword(text_for_match, p_rss_kw)
+        if kw_hit:
+            reasons.append(f"✅ Keyword match: {kw_hit}")
         else:
             blockers.append("❌ Keyword mismatch (your personal RSS keywords did not match)")
     else:
@@ -2077,9 +4277,7 @@ async def why(interaction: discord.Interaction, url: str):
     rid = _parse_reddit_id_from_url(url)
     if rid:
         try:
-            post = reddit.submission(id=rid)
-            # Touch fields to ensure fetch
-            _ = post.title
+            post = await lookup_reddit_post(rid)
             text = _explain_reddit_for_user(interaction.user.id, post)
             return await interaction.followup.send(embed=make_embed("Why (Reddit)", text), ephemeral=True)
         except Exception as e:
@@ -2143,9 +4341,9 @@ def _explain_reddit_for_user_expected(uid: int, post) -> str:
     # Keywords
     p_keywords = p.get("reddit_keywords", [])
     if p_keywords:
-        if matches_keywords_post(post, p_keywords):
-            kw_hit = _first_matching_keyword(f"{title} {body}", p_keywords)
-            reasons.append(f"✅ Keyword match: {kw_hit or '(matched)'}")
+        kw_hit = _first_matching_keyword(f"{title} {body}", p_keywords)
+        if kw_hit:
+            reasons.append(f"✅ Keyword match: {kw_hit}")
         else:
             blockers.append("❌ Keyword mismatch (your personal Reddit keywords did not match)")
             suggestions.append("Adjust with `/setmykeywords reddit:<...>` or clear your Reddit keywords to allow all.")
@@ -2239,9 +4437,9 @@ def _explain_rss_for_user_expected(uid: int, item: dict) -> str:
 
     p_rss_kw = p.get("rss_keywords", [])
     if p_rss_kw:
-        if matches_keywords_text(text_for_match, p_rss_kw):
-            kw_hit = _first_matching_keyword(text_for_match, p_rss_kw)
-            reasons.append(f"✅ Keyword match: {kw_hit or '(matched)'}")
+        kw_hit = _first_matching_keyword(text_for_match, p_rss_kw)
+        if kw_hit:
+            reasons.append(f"✅ Keyword match: {kw_hit}")
         else:
             blockers.append("❌ Keyword mismatch (your personal RSS keywords did not match)")
             suggestions.append("Adjust with `/setmykeywords rss:<...>` or clear your RSS keywords to allow all.")
@@ -2304,8 +4502,7 @@ async def whyexpected(interaction: discord.Interaction, url: str):
     rid = _parse_reddit_id_from_url(url)
     if rid:
         try:
-            post = reddit.submission(id=rid)
-            _ = post.title
+            post = await lookup_reddit_post(rid)
             text = _explain_reddit_for_user_expected(interaction.user.id, post)
             return await interaction.followup.send(embed=make_embed("WhyExpected (Reddit)", text), ephemeral=True)
         except Exception as e:
@@ -2346,9 +4543,9 @@ def _explain_global_reddit(post) -> str:
         reasons.append("✅ Global flair filter: ALL")
 
     if REDDIT_KEYWORDS:
-        if matches_keywords_text(f"{title}\n{body}", REDDIT_KEYWORDS):
-            kw_hit = _first_matching_keyword(f"{title} {body}", REDDIT_KEYWORDS)
-            reasons.append(f"✅ Keyword match (global filter): {kw_hit or '(matched)'}")
+        kw_hit = _first_matching_keyword(f"{title} {body}", REDDIT_KEYWORDS)
+        if kw_hit:
+            reasons.append(f"✅ Keyword match (global filter): {kw_hit}")
         else:
             blockers.append("❌ Keyword mismatch (global Reddit keywords)")
     else:
@@ -2359,7 +4556,7 @@ def _explain_global_reddit(post) -> str:
     kw_routed = None if flair_routed else _route_channel_global("reddit", title, body)
 
     outputs = []
-    outputs.append(f"Webhook: {'✅ set' if WEBHOOK_URL else '❌ none'}")
+    outputs.append(f"Webhooks: {len(webhook_targets('reddit')) or '❌ none'}")
     outputs.append(f"Channels: {', '.join(DISCORD_CHANNEL_IDS) if DISCORD_CHANNEL_IDS else 'none'}")
     outputs.append(f"Global DM fanout: {'✅ on' if ENABLE_DM else '❌ off'} (users: {', '.join(DISCORD_USER_IDS) if DISCORD_USER_IDS else 'none'})")
 
@@ -2400,9 +4597,9 @@ def _explain_global_rss(item: dict) -> str:
         blockers.append("❌ Feed is not in GLOBAL RSS_FEEDS")
 
     if RSS_KEYWORDS:
-        if matches_keywords_text(text_for_match, RSS_KEYWORDS):
-            kw_hit = _first_matching_keyword(text_for_match, RSS_KEYWORDS)
-            reasons.append(f"✅ Keyword match (global RSS filter): {kw_hit or '(matched)'}")
+        kw_hit = _first_matching_keyword(text_for_match, RSS_KEYWORDS)
+        if kw_hit:
+            reasons.append(f"✅ Keyword match (global RSS filter): {kw_hit}")
         else:
             blockers.append("❌ Keyword mismatch (global RSS keywords)")
     else:
@@ -2411,7 +4608,7 @@ def _explain_global_rss(item: dict) -> str:
     routed = _route_channel_global("rss", title, summary)
 
     outputs = []
-    outputs.append(f"Webhook: {'✅ set' if WEBHOOK_URL else '❌ none'}")
+    outputs.append(f"Webhooks: {len(webhook_targets('rss')) or '❌ none'}")
     outputs.append(f"Channels: {', '.join(DISCORD_CHANNEL_IDS) if DISCORD_CHANNEL_IDS else 'none'}")
     outputs.append(f"Global DM fanout: {'✅ on' if ENABLE_DM else '❌ off'} (users: {', '.join(DISCORD_USER_IDS) if DISCORD_USER_IDS else 'none'})")
 
@@ -2444,8 +4641,7 @@ async def whyglobal(interaction: discord.Interaction, url: str):
     rid = _parse_reddit_id_from_url(url)
     if rid:
         try:
-            post = reddit.submission(id=rid)
-            _ = post.title
+            post = await lookup_reddit_post(rid)
             text = _explain_global_reddit(post)
             return await interaction.followup.send(embed=make_embed("WhyGlobal (Reddit)", text), ephemeral=True)
         except Exception as e:
@@ -2464,16 +4660,21 @@ async def whyglobal(interaction: discord.Interaction, url: str):
 # ---------- Headless loop (webhook-only) ----------
 async def headless_loop():
     print("[INFO] Headless mode: webhook-only. Discord client not started.")
-    while True:
-        try:
-            await process_reddit()
-        except Exception as e:
-            print(f"[ERROR] Reddit fetch failed (headless): {e}")
-        try:
-            await process_rss()
-        except Exception as e:
-            print(f"[ERROR] RSS fetch failed (headless): {e}")
-        await asyncio.sleep(CHECK_INTERVAL)
+    try:
+        while True:
+            try:
+                await process_reddit()
+            except Exception as e:
+                print(f"[ERROR] Reddit fetch failed (headless): {e}")
+            try:
+                await process_rss()
+            except Exception as e:
+                print(f"[ERROR] RSS fetch failed (headless): {e}")
+            flush_cycle_marks()
+            await _state_writer.flush()
+            await asyncio.sleep(poll_tick_seconds())
+    finally:
+        await close_http_sessions()
 
 # ---------- Program entry ----------
 if not HEADLESS:
@@ -2499,6 +4700,9 @@ if not HEADLESS:
 
         # ---- Start background tasks only once per process ----
         if not _BG_TASKS_STARTED:
+            _delivery.start()
+            client.loop.create_task(thread_cache_maintenance())
+            client.loop.create_task(_state_writer.run())
             client.loop.create_task(fetch_and_notify())
             client.loop.create_task(digest_scheduler())
             _BG_TASKS_STARTED = True